@@ -4,7 +4,13 @@
 # ─────────────────────────────────────────────────────────────────────────────
 
 import streamlit as st
-from utils.helpers import ensure_session, render_header, render_webgpt_banner
+from utils.helpers import (
+    disable_persistence, enable_persistence, ensure_session, render_header, render_webgpt_banner,
+)
+from utils.batch_queue import BATCH_TTL_DAYS
+from utils.persistence import SESSION_TTL_DAYS
+from utils.router import AUTO_MODEL, MODEL_CHOICES, stats as routing_stats
+from utils.profiling import finish_page_profile, start_page_profile
 
 
 # -----------------------------------------------------------------------------
@@ -15,6 +21,7 @@ st.set_page_config(
     page_icon="📚",
     layout="wide"
 )
+_profile = start_page_profile("Home")
 
 # Initialize session state
 ensure_session()
@@ -39,7 +46,9 @@ with st.expander("How to use this app", expanded=True):
         - Enter your **OpenAI API key** below to enable the coach.
         - For literature or current events, use the **AI Research Workflow** module
           to craft your own prompts for Web GPT or Perplexity.
-        - This app does **not store any data**; everything stays local in your browser.
+        - By default your conversations stay in your browser session. The only exception is notes you
+          send for *feedback later*: they wait on the server, encrypted, until the feedback arrives.
+          You can opt in below to keep your conversations if your connection drops.
         """
     )
 
@@ -63,11 +72,28 @@ else:
 
 model = st.selectbox(
     "Model (cost-sensitive):",
-    ["gpt-4o-mini", "gpt-4o", "gpt-4.1-mini"],
+    MODEL_CHOICES,
     index=0,
     key="model"
 )
-st.caption("Tip: 4o-mini is usually <$0.20 for the entire semester of light use.")
+st.caption("Tip: 4o-mini is usually <$0.20 for the entire semester of light use. "
+           "**Auto** sends each turn to the cheapest model that can handle it.")
+
+if st.session_state.get("model") == AUTO_MODEL:
+    with st.expander("Auto routing stats (this server)"):
+        st.dataframe(routing_stats())
+
+# Opt-in, encrypted snapshots so a refresh or dropped connection keeps your work
+keep = st.toggle(
+    "💾 Keep my conversations if I get disconnected",
+    value=bool(st.session_state.get("resume_token")),
+    help=f"Saves your module dialogues encrypted on the course server for {SESSION_TTL_DAYS:g} days. "
+         "Only this page's link (with ?resume=…) can restore them — bookmark it.",
+)
+if keep and not st.session_state.get("resume_token"):
+    enable_persistence()
+elif not keep and st.session_state.get("resume_token"):
+    disable_persistence()
 
 # -----------------------------------------------------------------------------
 # 5. Ensure defaults exist
@@ -96,7 +122,7 @@ st.markdown(
     2. Hypothesis Design  
     3. Variable Measurement  
     4. Sampling & Inference  
-    5. Regression Logic (interpretation only)  
+    5. Regression Logic  
     6. Writing & Reporting  
     7. AI Research Workflow  
 
@@ -108,9 +134,15 @@ st.markdown(
 # 7. Footer / fine print
 # -----------------------------------------------------------------------------
 st.markdown(
-    """
+    f"""
     ---
-    **FERPA notice:** No data are stored. Your API key stays in your browser only.  
+    **FERPA notice:** Dialogues are stored only if you turn on *Keep my conversations* above;
+    then they are saved encrypted, readable only with your resume link, and deleted after
+    {SESSION_TTL_DAYS:g} days. Notes you send for *feedback later* are held encrypted on the server
+    until the feedback is delivered to you (at most {BATCH_TTL_DAYS:g} days) and then deleted.
+    Your API key stays in your browser only and is never saved.  
     [Learn more about using your own OpenAI key →](https://platform.openai.com/account/api-keys)
     """
 )
+
+finish_page_profile(_profile)
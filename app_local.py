@@ -5,6 +5,8 @@
 
 import streamlit as st
 from utils.helpers import ensure_session, render_header, render_webgpt_banner
+from utils.router import AUTO_MODEL, MODEL_CHOICES, stats as routing_stats
+from utils.profiling import finish_page_profile, start_page_profile
 
 # -----------------------------------------------------------------------------
 # Page setup
@@ -14,6 +16,7 @@ st.set_page_config(
     page_icon="📚",
     layout="wide"
 )
+_profile = start_page_profile("Home")
 
 ensure_session()
 
@@ -59,12 +62,17 @@ else:
 # Model choice (for cost sensitivity)
 model = st.selectbox(
     "Model (cost-sensitive):",
-    ["gpt-4o-mini", "gpt-4o", "gpt-4.1-mini"],
+    MODEL_CHOICES,
     index=0,
     key="model"
 )
 
-st.caption("Tip: 4o-mini is usually <$0.20 for the entire semester of light use.")
+st.caption("Tip: 4o-mini is usually <$0.20 for the entire semester of light use. "
+           "**Auto** sends each turn to the cheapest model that can handle it.")
+
+if st.session_state.get("model") == AUTO_MODEL:
+    with st.expander("Auto routing stats (this server)"):
+        st.dataframe(routing_stats())
 
 # -----------------------------------------------------------------------------
 # Web GPT banner + modules overview
@@ -79,10 +87,12 @@ st.markdown(
     2. Hypothesis Design
     3. Variable Measurement
     4. Sampling & Inference
-    5. Regression Logic (interpretation only)
+    5. Regression Logic
     6. Writing & Reporting
     7. Reflection Log
 
     **Reminder:** This app is your *reasoning coach*. It won’t write your paper for you.
     """
 )
+
+finish_page_profile(_profile)
@@ -3,19 +3,18 @@
 # ─────────────────────────────────────────────────────────────────────────────
 import streamlit as st
 from utils.helpers import module_chat_ui, render_header
-from utils.prompts import INTRO_SM
+from utils.prompts import INTRO_SM, STARTER_SM
+from utils.profiling import finish_page_profile, start_page_profile
 
 # --- ensure per-page session key sync ---
 if "api_key" not in st.session_state:
     st.session_state["api_key"] = ""
 
 st.set_page_config(page_title="Scientific Method", page_icon="🔬", layout="wide")
+_profile = start_page_profile("1_Scientific_Method", "Scientific Method")
 render_header("Module 1 — Scientific Method", "What makes a claim *scientific* in political inquiry?")
 
-starter = (
-    "**Goal:** Articulate a political phenomenon, a theory, and a testable implication.\n\n"
-    "**Coach promises:** I’ll ask for clarity on mechanisms, scope conditions, and falsifiability."
-)
+starter = STARTER_SM
 
 # -----------------------------------------------------------------------------
 # Tutor chat interface (auto-logging handled inside module_chat_ui)
@@ -25,3 +24,5 @@ module_chat_ui(
     prompt_hint="Describe your phenomenon, theory, and a testable implication…",
     starter=starter,
 )
+
+finish_page_profile(_profile)
@@ -3,19 +3,18 @@
 # ─────────────────────────────────────────────────────────────────────────────
 import streamlit as st
 from utils.helpers import module_chat_ui, render_header
-from utils.prompts import INTRO_HYP
+from utils.prompts import INTRO_HYP, STARTER_HYP
+from utils.profiling import finish_page_profile, start_page_profile
 
 # --- ensure per-page session key sync ---
 if "api_key" not in st.session_state:
     st.session_state["api_key"] = ""
 
 st.set_page_config(page_title="Hypothesis Design", page_icon="🧠", layout="wide")
+_profile = start_page_profile("2_Hypothesis_Design", "Hypothesis Design")
 render_header("Module 2 — Hypothesis Design", "Turn ideas into testable causal claims.")
 
-starter = (
-    "**Goal:** Draft a precise, directional, falsifiable hypothesis.\n\n"
-    "**Coach prompts:** Identify IV→DV direction, mechanism, and rival explanations."
-)
+starter = STARTER_HYP
 
 # -----------------------------------------------------------------------------
 # Tutor chat interface (auto-logging handled inside module_chat_ui)
@@ -25,3 +24,5 @@ module_chat_ui(
     prompt_hint="Write your one-sentence hypothesis and explain why it is causal…",
     starter=starter,
 )
+
+finish_page_profile(_profile)
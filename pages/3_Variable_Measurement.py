@@ -3,11 +3,14 @@
 # ─────────────────────────────────────────────────────────────────────────────
 import streamlit as st
 from utils.helpers import module_chat_ui, render_header
+from utils.prompts import STARTER_VM
+from utils.profiling import finish_page_profile, start_page_profile
 
 # -----------------------------------------------------------------------------
 # Page setup
 # -----------------------------------------------------------------------------
 st.set_page_config(page_title="Variable Measurement", page_icon="📏", layout="wide")
+_profile = start_page_profile("3_Variable_Measurement", "Variable Measurement")
 
 # --- ensure per-page session key sync ---
 if "api_key" not in st.session_state:
@@ -15,10 +18,7 @@ if "api_key" not in st.session_state:
 
 render_header("Module 3 — Variable Measurement", "Operationalize concepts into data.")
 
-starter = (
-    "**Goal:** Define IV and DV and propose concrete measurements.\n\n"
-    "**Coach prompts:** Levels of measurement, reliability, validity, bias, and proxies."
-)
+starter = STARTER_VM
 
 # -----------------------------------------------------------------------------
 # Tutor chat interface (auto-logging handled inside module_chat_ui)
@@ -28,3 +28,5 @@ module_chat_ui(
     prompt_hint="Name your IV and DV and propose specific measurements…",
     starter=starter,
 )
+
+finish_page_profile(_profile)
@@ -3,15 +3,20 @@
 # PSC 302 Research Methods Tutor (Interactive)
 # ─────────────────────────────────────────────────────────────────────────────
 
+import hashlib
 import streamlit as st
 import numpy as np
 import matplotlib.pyplot as plt
 from utils.helpers import render_header, module_chat_ui
+from utils.prompts import STARTER_SI
+from utils.stats import SamplingDistribution, grouped_moments, one_sample_t, summarize_csv, welch_t
+from utils.profiling import finish_page_profile, start_page_profile
 
 # -----------------------------------------------------------------------------
 # Page setup
 # -----------------------------------------------------------------------------
 st.set_page_config(page_title="Sampling and Inference", page_icon="📊", layout="wide")
+_profile = start_page_profile("4_Sampling_and_Inference", "Sampling & Inference")
 
 # --- ensure per-page session key sync ---
 if "api_key" not in st.session_state:
@@ -46,23 +51,37 @@ represents **sampling error**.
 """
 )
 
-# population and sliders
+# population and sliders (population fixed for the session so draws accumulate)
 pop_mean = 50
 pop_sd = 10
-population = np.random.normal(pop_mean, pop_sd, 10000)
+if "population" not in st.session_state:
+    st.session_state["population"] = np.random.normal(pop_mean, pop_sd, 10000)
+population = st.session_state["population"]
 sample_size = st.slider("Sample size (n)", 10, 500, 50, step=10)
 n_samples = st.slider("Number of samples to draw", 10, 500, 100, step=10)
 
-# draw repeated samples
-sample_means = [np.mean(np.random.choice(population, sample_size)) for _ in range(n_samples)]
+# Sample means are kept across reruns: raising n_samples draws only the new
+# ones, lowering it truncates. A new sample size starts a fresh distribution.
+dist = st.session_state.get("sampling_dist")
+if dist is None or st.session_state.get("sampling_dist_n") != sample_size:
+    half_width = 4 * pop_sd / np.sqrt(sample_size)
+    dist = SamplingDistribution(np.linspace(pop_mean - half_width, pop_mean + half_width, 26))
+    st.session_state["sampling_dist"] = dist
+    st.session_state["sampling_dist_n"] = sample_size
+
+dist.resize(
+    n_samples,
+    lambda k: np.random.choice(population, (k, sample_size)).mean(axis=1),
+)
 
 st.write(f"Population mean ≈ {pop_mean:.2f}")
-st.write(f"Mean of sample means ≈ {np.mean(sample_means):.2f}")
-st.write(f"Standard error ≈ {np.std(sample_means):.2f}")
+st.write(f"Mean of sample means ≈ {dist.moments.mean:.2f}")
+st.write(f"Standard error ≈ {np.sqrt(dist.moments.m2 / dist.moments.count):.2f}")
 
-# clean dark-themed histogram
+# clean dark-themed histogram (from the running bin counts)
 fig, ax = plt.subplots(figsize=(6, 4), facecolor="none")
-ax.hist(sample_means, bins=25, color="#38bdf8", edgecolor="white", alpha=0.85)
+ax.bar(dist.edges[:-1], dist.counts, width=np.diff(dist.edges), align="edge",
+       color="#38bdf8", edgecolor="white", alpha=0.85)
 for spine in ax.spines.values():
     spine.set_color("#e5e7eb")
 ax.tick_params(colors="#e5e7eb", labelsize=8)
@@ -207,6 +226,100 @@ if st.button("🎲 Draw new group samples"):
 
 st.divider()
 
+# -----------------------------------------------------------------------------
+# t-Tests on Your Own Data (CSV upload, streamed in chunks)
+# -----------------------------------------------------------------------------
+st.subheader("📂 t-Tests on Your Own Data")
+
+st.markdown(
+"""
+Upload a CSV (for example an ANES or CCES extract) to run the same tests on real data.
+Files up to 200 MB are read in chunks, so parsing needs little memory beyond the upload itself.
+"""
+)
+
+@st.cache_data(show_spinner="Summarizing columns…", max_entries=8)
+def _csv_summary(file_hash: str, _file):
+    """Column summary for an uploaded CSV, cached by file hash."""
+    return summarize_csv(_file)
+
+@st.cache_data(show_spinner="Computing group statistics…", max_entries=32)
+def _csv_groups(file_hash: str, value_col: str, group_col: str, _file):
+    return grouped_moments(_file, value_col, group_col)
+
+def _file_hash(f) -> str:
+    """Content hash of an upload, computed once per upload (keyed by file_id)."""
+    hashes = st.session_state.setdefault("upload_hashes", {})
+    if f.file_id not in hashes:
+        h = hashlib.sha256()
+        f.seek(0)
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+        hashes.clear()  # only the current upload is needed
+        hashes[f.file_id] = h.hexdigest()
+    return hashes[f.file_id]
+
+uploaded = st.file_uploader("Upload a CSV file", type=["csv"])
+
+if uploaded is not None:
+    file_hash = _file_hash(uploaded)
+    summary = _csv_summary(file_hash, uploaded)
+    # All-missing columns have nothing to test
+    numeric_cols = [c for c, m in summary["numeric"].items() if m.count > 0]
+
+    if not numeric_cols:
+        st.warning("No numeric columns found in this file.")
+    else:
+        st.caption(f"{summary['rows']:,} rows · {len(numeric_cols)} numeric columns")
+        value_col = st.selectbox("Outcome variable", numeric_cols)
+        m = summary["numeric"][value_col]
+        st.write(f"n = **{m.count:,}**, mean = **{m.mean:.3f}**, SD = **{m.sd:.3f}**")
+
+        # --- One-sample test against a hypothesized mean ---
+        mu0 = st.number_input("Hypothesized mean (μ₀)", value=round(m.mean, 2), key="upload_mu0")
+        res = one_sample_t(m, mu0)
+        if res["note"]:
+            st.warning(res["note"])
+        else:
+            st.write(
+                f"One-sample t = **{res['t']:.2f}** (df = {res['df']:,}), "
+                f"SE = {res['se']:.3f}, p = **{res['p']:.4f}**"
+            )
+
+        # --- Welch difference of means between two groups ---
+        group_cols = [c for c, lv in summary["levels"].items() if c != value_col and len(lv) >= 2]
+        if group_cols:
+            group_col = st.selectbox("Grouping variable", group_cols)
+            groups = _csv_groups(file_hash, value_col, group_col, uploaded)
+            levels = [lv for lv, g in groups.items() if g.count > 1]
+            if len(levels) >= 2:
+                c1, c2 = st.columns(2)
+                with c1:
+                    g1 = st.selectbox("Group 1", levels, index=0)
+                with c2:
+                    g2 = st.selectbox("Group 2", levels, index=1)
+                if g1 != g2:
+                    a, b = groups[g1], groups[g2]
+                    res = welch_t(a, b)
+                    st.write(
+                        f"Mean₁ = **{a.mean:.3f}** (n = {a.count:,}), "
+                        f"Mean₂ = **{b.mean:.3f}** (n = {b.count:,})"
+                    )
+                    if res["note"]:
+                        st.warning(res["note"])
+                    else:
+                        st.write(
+                            f"Difference = **{res['diff']:.3f}**, SE = {res['se']:.3f}, "
+                            f"Welch t = **{res['t']:.2f}** (df ≈ {res['df']:.1f}), p = **{res['p']:.4f}**"
+                        )
+                    st.caption(
+                        "Welch's test does not assume the two groups have equal variances. "
+                        "With very large n, even tiny differences become 'significant' — "
+                        "ask whether the difference is substantively meaningful."
+                    )
+
+st.divider()
+
 # -----------------------------------------------------------------------------
 # Conceptual tie-back and Tutor chat
 # -----------------------------------------------------------------------------
@@ -220,13 +333,12 @@ expectation, in standard error units.
 """
 )
 
-starter = (
-    "Let's discuss how sampling error leads to uncertainty, and how t-tests "
-    "quantify whether observed differences are likely due to chance."
-)
+starter = STARTER_SI
 
 module_chat_ui(
     module_key="Sampling & Inference",  # ← clean, descriptive name for logs
     prompt_hint="Ask about sampling error, hypothesis tests, or p-values…",
     starter=starter
 )
+
+finish_page_profile(_profile)
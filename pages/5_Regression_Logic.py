@@ -2,27 +2,152 @@
 # pages/5_Regression_Logic.py
 # ─────────────────────────────────────────────────────────────────────────────
 import streamlit as st
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
 from utils.helpers import module_chat_ui, render_header
+from utils.ols import DesignCache, simulate_ovb
+from utils.prompts import STARTER_REG
+from utils.profiling import finish_page_profile, start_page_profile
 
 # -----------------------------------------------------------------------------
 # Page setup
 # -----------------------------------------------------------------------------
 st.set_page_config(page_title="Regression Logic", page_icon="📈", layout="wide")
+_profile = start_page_profile("5_Regression_Logic", "Regression Logic")
 
 # --- ensure per-page session key sync ---
 if "api_key" not in st.session_state:
     st.session_state["api_key"] = ""
 
 render_header(
-    "Module 5 — Regression Logic (Interpretation Only)",
-    "What coefficients mean conceptually; no computation here."
+    "Module 5 — Regression Logic",
+    "Fit a model, then practice interpreting coefficients, SEs, p-values, and fit."
 )
 
-starter = (
-    "**Goal:** Practice interpretation of coefficients, SEs, p-values, and model fit.\n\n"
-    "**Coach prompts:** Omitted variable bias, sign/direction, magnitude vs significance."
+# -----------------------------------------------------------------------------
+# Interactive regression panel (simulated survey data)
+# -----------------------------------------------------------------------------
+st.subheader("📐 Run a Regression")
+
+st.markdown(
+"""
+The data below are a **simulated survey**. Pick an outcome and add controls one at a
+time, and watch how the coefficient on your main IV changes.
+"""
 )
 
+@st.cache_data(show_spinner=False, max_entries=4)
+def make_survey(n: int, seed: int = 302) -> pd.DataFrame:
+    """Simulated survey with a known data-generating process."""
+    rng = np.random.default_rng(seed)
+    education = rng.normal(14, 2.5, n)
+    age = rng.uniform(18, 85, n)
+    income = 20 + 3.0 * education + 0.3 * age + rng.normal(0, 15, n)
+    news_interest = 0.4 * education + rng.normal(0, 2, n)
+    partisanship = rng.normal(0, 1, n)
+    participation = 0.25 * education + 0.02 * age + 0.01 * income + 0.3 * news_interest \
+        + 0.2 * np.abs(partisanship) + rng.normal(0, 1, n)
+    trust_gov = 5 - 0.05 * age + 0.1 * education - 0.3 * partisanship + rng.normal(0, 1.5, n)
+    return pd.DataFrame({
+        "participation": participation,
+        "trust_gov": trust_gov,
+        "education": education,
+        "age": age,
+        "income": income,
+        "news_interest": news_interest,
+        "partisanship": partisanship,
+    })
+
+OUTCOMES = ["participation", "trust_gov"]
+REGRESSORS = ["education", "age", "income", "news_interest", "partisanship"]
+
+n_rows = st.select_slider("Number of respondents", [1_000, 10_000, 100_000], value=10_000)
+df = make_survey(n_rows)
+
+col1, col2 = st.columns(2)
+with col1:
+    dv = st.selectbox("Dependent variable (DV)", OUTCOMES)
+with col2:
+    iv = st.selectbox("Main independent variable (IV)", REGRESSORS)
+controls = st.multiselect("Controls (added in the order you pick them)",
+                          [r for r in REGRESSORS if r != iv])
+
+@st.cache_resource(show_spinner=False)
+def design_cache() -> DesignCache:
+    """One factorization cache for all sessions (the survey data are the same for everyone)."""
+    return DesignCache(max_entries=16)
+
+# Factorizations are shared: a new DV or one extra control reuses them
+designs = design_cache()
+column = lambda name: np.ones(n_rows) if name == "(Intercept)" else df[name].to_numpy()
+try:
+    design = designs.get(f"survey-{n_rows}", ["(Intercept)", iv, *controls], column)
+    fit = design.fit(df[dv].to_numpy())
+except ValueError as e:
+    st.error(str(e))
+else:
+    table = pd.DataFrame(
+        {"coef": fit["coef"], "std. error": fit["se"], "t": fit["t"], "p": fit["p"]},
+        index=fit["names"],
+    )
+    st.dataframe(table.style.format({"coef": "{:.3f}", "std. error": "{:.3f}", "t": "{:.2f}", "p": "{:.4f}"}))
+    st.write(f"R² = **{fit['r2']:.3f}**, n = **{fit['n']:,}**")
+    st.caption(
+        "Interpretation: a one-unit increase in the IV is associated with a change of *coef* "
+        "in the DV, holding the listed controls constant. Ask whether it is large, not just significant."
+    )
+
+st.divider()
+
+# -----------------------------------------------------------------------------
+# Omitted variable bias demo (hundreds of specifications, one vectorized fit)
+# -----------------------------------------------------------------------------
+st.subheader("🕳️ Omitted Variable Bias")
+
+st.markdown(
+"""
+Each dot is one simulated study. The true effect of *x* is fixed, but a confounder *z*
+correlates with *x* by a different amount (ρ) each time. Leaving *z* out (short
+regression) biases the estimate; controlling for it (long regression) does not.
+"""
+)
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    beta_x = st.number_input("True effect of x", value=1.0)
+with col2:
+    beta_z = st.number_input("Effect of confounder z", value=0.8)
+with col3:
+    n_specs = st.slider("Number of simulated studies", 100, 1000, 400, step=100)
+
+sim = simulate_ovb(n_specs, 200, beta_x, beta_z, np.random.default_rng(302))
+
+fig, ax = plt.subplots(figsize=(6, 4), facecolor="none")
+ax.scatter(sim["rho"], sim["short"], s=8, color="#f472b6", alpha=0.7, label="Short (omits z)")
+ax.scatter(sim["rho"], sim["long"], s=8, color="#38bdf8", alpha=0.7, label="Long (controls z)")
+ax.axhline(beta_x, color="white", linestyle="--", linewidth=1.2, label="True effect")
+for spine in ax.spines.values():
+    spine.set_color("#e5e7eb")
+ax.tick_params(colors="#e5e7eb", labelsize=8)
+ax.xaxis.label.set_color("#e5e7eb")
+ax.yaxis.label.set_color("#e5e7eb")
+ax.title.set_color("#e5e7eb")
+ax.set_xlabel("Correlation between x and z (ρ)", fontsize=9)
+ax.set_ylabel("Estimated effect of x", fontsize=9)
+ax.set_title("Short vs Long Regression Estimates", fontsize=10, pad=6)
+ax.legend(facecolor="none", edgecolor="none", labelcolor="#e5e7eb", fontsize=8)
+st.pyplot(fig, transparent=True)
+
+st.caption(
+    "The short-regression bias is roughly (effect of z) × ρ: it vanishes when x and z are "
+    "uncorrelated and flips sign with ρ."
+)
+
+st.divider()
+
+starter = STARTER_REG
+
 # -----------------------------------------------------------------------------
 # Tutor chat interface (auto-logging handled inside module_chat_ui)
 # -----------------------------------------------------------------------------
@@ -31,3 +156,5 @@ module_chat_ui(
     prompt_hint="Explain how you’d interpret a positive, significant coefficient on your IV…",
     starter=starter,
 )
+
+finish_page_profile(_profile)
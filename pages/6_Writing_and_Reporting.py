@@ -3,11 +3,14 @@
 # ─────────────────────────────────────────────────────────────────────────────
 import streamlit as st
 from utils.helpers import module_chat_ui, render_header
+from utils.prompts import STARTER_WR
+from utils.profiling import finish_page_profile, start_page_profile
 
 # -----------------------------------------------------------------------------
 # Page setup
 # -----------------------------------------------------------------------------
 st.set_page_config(page_title="Writing & Reporting", page_icon="📝", layout="wide")
+_profile = start_page_profile("6_Writing_and_Reporting", "Writing & Reporting")
 
 # --- ensure per-page session key sync ---
 if "api_key" not in st.session_state:
@@ -15,10 +18,7 @@ if "api_key" not in st.session_state:
 
 render_header("Module 6 — Writing & Reporting", "Clear, honest claims without overreach.")
 
-starter = (
-    "**Goal:** Draft a short, sober results paragraph (hypothetical).\n\n"
-    "**Coach prompts:** Scope conditions, limitations, effect sizes, and policy relevance."
-)
+starter = STARTER_WR
 
 # -----------------------------------------------------------------------------
 # Tutor chat interface (auto-logging handled inside module_chat_ui)
@@ -28,3 +28,5 @@ module_chat_ui(
     prompt_hint="Draft a 3-sentence results paragraph and list one limitation…",
     starter=starter,
 )
+
+finish_page_profile(_profile)
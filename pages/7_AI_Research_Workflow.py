@@ -3,9 +3,12 @@
 # PSC 302 — Tier 2: AI Research Workflow
 # ─────────────────────────────────────────────────────────────────────────────
 import streamlit as st
-from utils.helpers import render_header, log_interaction
+from utils.helpers import render_header, log_interaction, queue_feedback, render_deferred_feedback
+from utils.prompts import INTRO_REFLECT
+from utils.profiling import finish_page_profile, start_page_profile
 
 st.set_page_config(page_title="AI Research Workflow", page_icon="🧠", layout="wide")
+_profile = start_page_profile("7_AI_Research_Workflow", "AI Research Workflow")
 
 # -----------------------------------------------------------------------------
 # 1. Header + purpose
@@ -73,13 +76,45 @@ notes = st.text_area(
 if notes.strip():
     log_interaction("AI Research Workflow", notes, note_type="notes")
 
+    if st.button("📬 Get feedback on these notes later"):
+        queue_feedback(
+            "AI Research Workflow",
+            notes,
+            "Review the student's literature notes: check that claims are tied to citations, "
+            "flag anything that needs verification, and suggest one next search.",
+        )
+        st.success("Queued! Feedback will appear on this page once it is ready.")
+
+st.divider()
+
+# -----------------------------------------------------------------------------
+# 5. Step 3 — End-of-module reflection (feedback delivered later)
+# -----------------------------------------------------------------------------
+st.subheader("🪞 Step 3: Reflect")
+
+reflection = st.text_area(INTRO_REFLECT, placeholder="- The tutor helped me…")
+
+if reflection.strip() and st.button("📬 Get feedback on my reflection later"):
+    log_interaction("AI Research Workflow", reflection, note_type="reflection")
+    queue_feedback(
+        "AI Research Workflow",
+        reflection,
+        "Give brief feedback on the student's reflection. Comment on the verification step they describe.",
+    )
+    st.success("Queued! Feedback will appear on this page once it is ready.")
+
+render_deferred_feedback("AI Research Workflow")
+
 st.divider()
 
 # -----------------------------------------------------------------------------
-# 5. Footer note
+# 6. Footer note
 # -----------------------------------------------------------------------------
 st.markdown("""
 ---
-**Reminder:** Your data stay local in this browser session.  
+**Reminder:** Your data stay in this browser session, except notes sent for *feedback later*:
+those are held encrypted on the server until the feedback is delivered, then deleted.  
 Use this space to think critically about what you find — not to automate writing.
 """)
+
+finish_page_profile(_profile)
@@ -0,0 +1,50 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# scripts/build_opening_cache.py — generate per-module opening scaffolds
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Run at deploy time with an API key in OPENAI_API_KEY:
+#     python scripts/build_opening_cache.py [model ...]
+# For every module in utils.prompts.MODULE_STARTERS and every model given
+# (default: the fast and strong routing models), asks the model for a generic
+# coaching scaffold and writes it to data/opening_templates.json. Existing
+# entries (including the hand-written "default" ones) are kept unless
+# regenerated.
+# ─────────────────────────────────────────────────────────────────────────────
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from openai import OpenAI  # noqa: E402
+
+from utils.opening_cache import TEMPLATE_PATH  # noqa: E402
+from utils.prompts import MODULE_STARTERS  # noqa: E402
+from utils.router import FAST_MODEL, STRONG_MODEL  # noqa: E402
+
+SCAFFOLD_PROMPT = (
+    "You are a patient, Socratic research methods tutor for PSC 302. A student is "
+    "about to send their first message in the module below. Write the generic opening "
+    "of your reply (60–100 words): briefly frame what a strong answer needs and list "
+    "the 2–3 probing questions you will push them on. Do not refer to anything the "
+    "student said; a personalized follow-up will be appended after your text.\n\n"
+    "Module: {module}\n{starter}"
+)
+
+if __name__ == "__main__":
+    models = sys.argv[1:] or [FAST_MODEL, STRONG_MODEL]
+    client = OpenAI()
+    templates = json.loads(TEMPLATE_PATH.read_text(encoding="utf-8")) if TEMPLATE_PATH.exists() else {}
+
+    for module, starter in MODULE_STARTERS.items():
+        for model in models:
+            resp = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": SCAFFOLD_PROMPT.format(module=module, starter=starter)}],
+                temperature=0.3,
+            )
+            templates.setdefault(module, {})[model] = resp.choices[0].message.content.strip()
+            print(f"built {module} / {model}")
+
+    TEMPLATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    TEMPLATE_PATH.write_text(json.dumps(templates, ensure_ascii=False, indent=2), encoding="utf-8")
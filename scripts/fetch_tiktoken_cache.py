@@ -0,0 +1,37 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# scripts/fetch_tiktoken_cache.py — vendor tiktoken BPE files for offline use
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Deploy step (see tiktoken_cache/README.md). Run with network access, then
+# commit the result:
+#     python scripts/fetch_tiktoken_cache.py
+# The files land in ./tiktoken_cache, which utils/helpers.py uses as
+# TIKTOKEN_CACHE_DIR, so the app never downloads encodings at runtime.
+# ─────────────────────────────────────────────────────────────────────────────
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+os.environ["TIKTOKEN_CACHE_DIR"] = os.getenv("TIKTOKEN_CACHE_DIR", str(ROOT / "tiktoken_cache"))
+
+import tiktoken  # noqa: E402  (must follow the env var)
+
+ENCODINGS = ["o200k_base", "cl100k_base"]
+# Must match utils/helpers.py, which checks for these files before loading
+BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+
+if __name__ == "__main__":
+    cache = Path(os.environ["TIKTOKEN_CACHE_DIR"])
+    cache.mkdir(parents=True, exist_ok=True)
+    missing = []
+    for name in ENCODINGS:
+        enc = tiktoken.get_encoding(name)
+        path = cache / hashlib.sha1(BLOB_URL.format(name=name).encode()).hexdigest()
+        if path.exists():
+            print(f"cached {name} ({enc.n_vocab} tokens) as {path}")
+        else:
+            missing.append(name)
+    if missing:
+        sys.exit(f"not found in {cache} after loading: {', '.join(missing)}")
@@ -0,0 +1,518 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/batch_queue.py — deferred "get feedback later" queue for PSC 302 Tutor
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Non-interactive feedback requests (reflections, pasted literature notes) are
+# appended to a small on-disk queue instead of going through send_chat. When a
+# session's queue is due, the items are written out as one Batch-API JSONL job
+# and submitted in bulk; completed results are collected on a later rerun.
+#
+# Submission and polling run on one background thread (start_worker / watch),
+# never on the script thread, so a page rerun only reads local files. Like
+# chat_jobs, the worker uses an endpoint (client + key) captured on the script
+# thread; it is dropped once the queue is empty or the student goes idle.
+#
+# Each student has their own queue directory because students bring their own
+# API key: a batch is always submitted and polled with the key of the student
+# who queued it, and keys are never written to disk. The owner id is the
+# resume-token id when the student opted into persistence (so the queue
+# survives a reconnect), otherwise the browser session id.
+#
+# Student text never touches disk in the clear: prompts, request bodies and
+# replies are sealed with the owner's Fernet cipher (derived from the resume
+# token, or a random key kept only in the browser session). Results are
+# deleted once delivered, and whole queues older than BATCH_TTL_DAYS are
+# purged.
+#
+# Layout (one directory per owner id; "data" fields are encrypted):
+#   <BATCH_DIR>/<owner>/pending.jsonl      queued, not yet submitted
+#   <BATCH_DIR>/<owner>/inflight_*.jsonl   taken for a submit in progress
+#   <BATCH_DIR>/<owner>/batches.json       submitted batch ids → custom ids
+#   <BATCH_DIR>/<owner>/results.jsonl      completed, not yet delivered
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+# -----------------------------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------------------------
+BATCH_DIR = Path(os.getenv("PSC302_BATCH_DIR", ".feedback_queue"))
+BATCH_ENDPOINT = os.getenv("PSC302_BATCH_ENDPOINT", "openai")  # "openai" | "local"
+FLUSH_MIN_ITEMS = int(os.getenv("PSC302_BATCH_MIN_ITEMS", "3"))
+FLUSH_MAX_AGE = float(os.getenv("PSC302_BATCH_MAX_AGE", "300"))  # seconds
+POLL_INTERVAL = float(os.getenv("PSC302_BATCH_POLL_INTERVAL", "60"))  # seconds
+BATCH_TTL_DAYS = float(os.getenv("PSC302_BATCH_TTL_DAYS", "3"))  # > the 24h completion window
+PURGE_INTERVAL = 3600.0  # seconds between TTL purges
+WORKER_INTERVAL = 5.0  # seconds between background passes
+OWNER_IDLE = 900.0  # forget a captured endpoint after this long without a rerun
+
+CHAT_URL = "/v1/chat/completions"
+INFLIGHT_STALE = 600.0  # seconds before an interrupted submit is re-queued
+
+# _lock guards pending/inflight files; _books_lock guards batches.json and
+# results.jsonl. Neither is ever held across a network call.
+_lock = threading.Lock()
+_books_lock = threading.Lock()
+_last_purge = 0.0
+
+_owners: Dict[str, Dict] = {}  # owner id → endpoint, cipher, last seen/poll, last error
+_owners_lock = threading.Lock()
+_wake = threading.Event()
+_worker: Optional[threading.Thread] = None
+
+
+# -----------------------------------------------------------------------------
+# File helpers
+# -----------------------------------------------------------------------------
+def _session_dir(session_id: str) -> Path:
+    path = BATCH_DIR / session_id
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _read_jsonl(path: Path) -> List[Dict]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _append_jsonl(path: Path, rows: List[Dict]):
+    """Append rows and fsync so queued work survives a crash or redeploy."""
+    with path.open("a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def _write_json(path: Path, data):
+    """Atomically replace a JSON file (write to temp, then rename)."""
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _read_json(path: Path, default):
+    if not path.exists():
+        return default
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+def _seal(cipher: Fernet, data) -> str:
+    return cipher.encrypt(json.dumps(data, ensure_ascii=False).encode()).decode()
+
+def _unseal(cipher: Fernet, token: str):
+    """Decrypt a sealed field; None if it was sealed with another (lost) key."""
+    try:
+        return json.loads(cipher.decrypt(token.encode()))
+    except InvalidToken:
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Batch endpoints (OpenAI Batch API, or a local stand-in for testing)
+# -----------------------------------------------------------------------------
+class BatchFailed(RuntimeError):
+    """A batch reached a terminal failed/expired/cancelled state upstream."""
+
+
+class OpenAIBatchEndpoint:
+    """Submit JSONL jobs through the OpenAI Batch API."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, jsonl: bytes) -> str:
+        uploaded = self.client.files.create(file=("feedback.jsonl", jsonl), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_URL,
+            completion_window="24h",
+        )
+        return batch.id
+
+    def fetch(self, batch_id: str) -> Optional[str]:
+        """
+        Return the result JSONL once the batch is done, else None.
+
+        Successful requests are in the output file and failed ones in the
+        error file; either id is None when it has no lines.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return "\n".join(
+                self.client.files.content(file_id).text
+                for file_id in (batch.output_file_id, batch.error_file_id) if file_id
+            )
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise BatchFailed(f"Batch {batch_id} {batch.status}")
+        return None
+
+
+class LocalBatchEndpoint:
+    """
+    Drop-in stand-in for the Batch API that answers every request locally.
+
+    Parameters
+    ----------
+    respond : callable, optional
+        Maps a chat-completions request body to reply text. Defaults to a
+        canned acknowledgement, which is enough to exercise the queue.
+    """
+
+    def __init__(self, respond: Optional[Callable[[Dict], str]] = None):
+        self.respond = respond or (lambda body: "Feedback placeholder (local batch endpoint).")
+        self._outputs: Dict[str, str] = {}
+
+    def submit(self, jsonl: bytes) -> str:
+        lines = []
+        for req in map(json.loads, jsonl.decode().splitlines()):
+            lines.append(json.dumps({
+                "custom_id": req["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "body": {"choices": [{"message": {
+                        "role": "assistant",
+                        "content": self.respond(req["body"]),
+                    }}]},
+                },
+                "error": None,
+            }))
+        batch_id = f"local_{uuid.uuid4().hex[:12]}"
+        self._outputs[batch_id] = "\n".join(lines)
+        return batch_id
+
+    def fetch(self, batch_id: str) -> Optional[str]:
+        return self._outputs.pop(batch_id, "")
+
+
+_local_endpoint = LocalBatchEndpoint()
+
+def get_endpoint(client=None):
+    """Return the configured batch endpoint (None if it needs a client we lack)."""
+    if BATCH_ENDPOINT == "local":
+        return _local_endpoint
+    if client is None:
+        return None
+    return OpenAIBatchEndpoint(client)
+
+
+# -----------------------------------------------------------------------------
+# Queue operations
+# -----------------------------------------------------------------------------
+def enqueue(session_id: str, cipher: Fernet, module: str, prompt: str,
+            messages: List[Dict[str, str]], model: str,
+            temperature: float = 0.3) -> str:
+    """Append one feedback request to the session's durable queue; return its id."""
+    item = {
+        "custom_id": f"fb_{uuid.uuid4().hex}",
+        "queued_at": time.time(),
+        "data": _seal(cipher, {
+            "module": module,
+            "prompt": prompt,
+            "body": {"model": model, "messages": messages, "temperature": temperature},
+        }),
+    }
+    with _lock:
+        _append_jsonl(_session_dir(session_id) / "pending.jsonl", [item])
+    _wake.set()
+    return item["custom_id"]
+
+def status(session_id: str) -> Dict[str, int]:
+    """Counts of queued and submitted-but-unfinished requests for a session."""
+    path = BATCH_DIR / session_id
+    with _lock:
+        queued = len(_read_jsonl(path / "pending.jsonl"))
+        queued += sum(len(_read_jsonl(p)) for p in path.glob("inflight_*.jsonl"))
+    with _books_lock:
+        batches = _read_json(path / "batches.json", {})
+    return {"queued": queued, "submitted": sum(len(b["items"]) for b in batches.values())}
+
+def flush(session_id: str, endpoint, cipher: Fernet, force: bool = False) -> Optional[str]:
+    """
+    Submit the session's pending requests as one batch if the queue is due.
+
+    The queue is due once it holds FLUSH_MIN_ITEMS requests or its oldest
+    request has waited FLUSH_MAX_AGE seconds. Returns the batch id, or None
+    if nothing was submitted.
+    """
+    path = _session_dir(session_id)
+    pending_path = path / "pending.jsonl"
+    with _lock:
+        # Re-queue items from a submit that was interrupted (crash, redeploy)
+        for stale in path.glob("inflight_*.jsonl"):
+            if time.time() - stale.stat().st_mtime >= INFLIGHT_STALE:
+                _append_jsonl(pending_path, _read_jsonl(stale))
+                stale.unlink()
+
+        pending = _read_jsonl(pending_path)
+        if not pending:
+            return None
+        oldest = min(item["queued_at"] for item in pending)
+        due = len(pending) >= FLUSH_MIN_ITEMS or time.time() - oldest >= FLUSH_MAX_AGE
+        if not (due or force):
+            return None
+
+        # Take the items out of pending.jsonl so new enqueues start a fresh file
+        inflight_path = path / f"inflight_{uuid.uuid4().hex[:12]}.jsonl"
+        os.replace(pending_path, inflight_path)
+
+    # Items sealed with a lost key (an earlier browser session) cannot be sent
+    items = {item["custom_id"]: _unseal(cipher, item["data"]) for item in pending}
+    items = {cid: data for cid, data in items.items() if data is not None}
+    # The job file is built in memory so the plaintext never touches disk
+    job = "".join(
+        json.dumps({"custom_id": cid, "method": "POST", "url": CHAT_URL, "body": data["body"]},
+                   ensure_ascii=False) + "\n"
+        for cid, data in items.items()
+    ).encode()
+
+    # Upload + batch creation happen without any lock held
+    batch_id = None
+    if items:
+        try:
+            batch_id = endpoint.submit(job)
+        except Exception:
+            with _lock:
+                _append_jsonl(pending_path, pending)
+                inflight_path.unlink(missing_ok=True)
+            raise
+
+        with _books_lock:
+            batches = _read_json(path / "batches.json", {})
+            batches[batch_id] = {
+                "submitted_at": time.time(),
+                "items": {cid: _seal(cipher, {"module": data["module"], "prompt": data["prompt"]})
+                          for cid, data in items.items()},
+            }
+            _write_json(path / "batches.json", batches)
+    with _lock:
+        inflight_path.unlink(missing_ok=True)
+    return batch_id
+
+def _reply(row: Dict) -> str:
+    """Reply text of one Batch-API result line, or an explanation if it failed."""
+    response = row.get("response") or {}
+    body = response.get("body") or {}
+    if not row.get("error") and response.get("status_code") == 200:
+        try:
+            return body["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            return "(Feedback unavailable: malformed reply)"
+    error = row.get("error") or (body.get("error") if isinstance(body, dict) else None) or {}
+    message = error.get("message") or f"HTTP {response.get('status_code', 'error')}"
+    return f"(Feedback unavailable: {message})"
+
+def _result(cipher: Fernet, custom_id: str, sealed_meta: str, reply: str) -> Dict:
+    meta = _unseal(cipher, sealed_meta) or {}
+    return {"custom_id": custom_id, "finished_at": time.time(), "data": _seal(cipher, {
+        "module": meta.get("module", ""), "prompt": meta.get("prompt", ""), "response": reply,
+    })}
+
+def poll(session_id: str, endpoint, cipher: Fernet) -> int:
+    """
+    Collect results from any finished batches for this session.
+
+    Completed feedback is appended (encrypted) to results.jsonl for
+    undelivered() to pick up. Returns the number of new results.
+    """
+    path = BATCH_DIR / session_id
+    with _books_lock:
+        batches = _read_json(path / "batches.json", {})
+    if not batches:
+        return 0
+
+    collected, done = [], []
+    for batch_id, batch in batches.items():
+        try:
+            output = endpoint.fetch(batch_id)
+        except BatchFailed as e:
+            output = "\n".join(
+                json.dumps({"custom_id": cid, "response": None, "error": {"message": str(e)}})
+                for cid in batch["items"]
+            )
+        except Exception:
+            continue  # transient (network, timeout): the batch may still finish; retry next poll
+        if output is None:
+            continue
+
+        answered = set()
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                custom_id = row["custom_id"]
+            except (ValueError, KeyError, TypeError):
+                continue  # unparseable line; its item is reported as missing below
+            if custom_id not in batch["items"] or custom_id in answered:
+                continue
+            answered.add(custom_id)
+            collected.append(_result(cipher, custom_id, batch["items"][custom_id], _reply(row)))
+        for custom_id, meta in batch["items"].items():
+            if custom_id not in answered:
+                collected.append(_result(cipher, custom_id, meta,
+                                         "(Feedback unavailable: no result returned)"))
+        done.append(batch_id)
+
+    if not done:
+        return 0
+    with _books_lock:
+        if collected:
+            _append_jsonl(path / "results.jsonl", collected)
+        # Re-read so a batch submitted while we were polling is not dropped
+        batches = _read_json(path / "batches.json", {})
+        for batch_id in done:
+            batches.pop(batch_id, None)
+        _write_json(path / "batches.json", batches)
+    return len(collected)
+
+def undelivered(session_id: str, cipher: Fernet) -> List[Dict]:
+    """
+    Completed feedback not yet handed to the student (e.g. while they were away).
+
+    Each entry has custom_id, module, prompt and response.
+    """
+    path = BATCH_DIR / session_id / "results.jsonl"
+    with _books_lock:
+        rows = _read_jsonl(path)
+    results = []
+    for row in rows:
+        data = _unseal(cipher, row["data"])
+        if data is not None:
+            results.append({"custom_id": row["custom_id"], **data})
+    return results
+
+def mark_delivered(session_id: str, custom_ids: List[str]):
+    """Delete delivered results; remove the queue directory once it is empty."""
+    if not custom_ids:
+        return
+    path = BATCH_DIR / session_id
+    delivered = set(custom_ids)
+    with _lock, _books_lock:
+        rows = [r for r in _read_jsonl(path / "results.jsonl") if r["custom_id"] not in delivered]
+        (path / "results.jsonl").unlink(missing_ok=True)
+        if rows:
+            _append_jsonl(path / "results.jsonl", rows)
+        elif not ((path / "pending.jsonl").exists() or any(path.glob("inflight_*.jsonl"))
+                  or _read_json(path / "batches.json", {})):
+            shutil.rmtree(path, ignore_errors=True)
+
+def _reseal(path: Path, old: Fernet, new: Fernet):
+    """Re-encrypt every sealed field in one queue directory (unreadable ones are dropped)."""
+    for file in [path / "pending.jsonl", path / "results.jsonl", *path.glob("inflight_*.jsonl")]:
+        if file.exists():
+            rows = []
+            for row in _read_jsonl(file):
+                data = _unseal(old, row["data"])
+                if data is not None:
+                    rows.append({**row, "data": _seal(new, data)})
+            file.unlink()
+            if rows:
+                _append_jsonl(file, rows)
+    batches = _read_json(path / "batches.json", None)
+    if batches:
+        for batch in batches.values():
+            batch["items"] = {cid: _seal(new, _unseal(old, meta) or {})
+                              for cid, meta in batch["items"].items()}
+        _write_json(path / "batches.json", batches)
+
+def adopt(old_id: str, old_cipher: Fernet, new_id: str, new_cipher: Fernet):
+    """Move a queue to a new owner id and key (e.g. when the student opts in or out)."""
+    old, new = BATCH_DIR / old_id, BATCH_DIR / new_id
+    if old_id == new_id or not old.exists():
+        return
+    with _lock, _books_lock:
+        if new.exists():
+            return  # keep the existing queue; the old one is purged after the TTL
+        _reseal(old, old_cipher, new_cipher)
+        new.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(old, new)
+
+def purge_expired():
+    """
+    Delete queues untouched for BATCH_TTL_DAYS (abandoned sessions, lost keys).
+    Runs at most once per PURGE_INTERVAL; extra calls return immediately.
+    """
+    global _last_purge
+    if time.time() - _last_purge < PURGE_INTERVAL:
+        return
+    _last_purge = time.time()
+    if not BATCH_DIR.exists():
+        return
+    cutoff = time.time() - BATCH_TTL_DAYS * 86400
+    with _lock, _books_lock:
+        for path in BATCH_DIR.iterdir():
+            if not path.is_dir():
+                continue
+            newest = max([f.stat().st_mtime for f in path.iterdir()] or [path.stat().st_mtime])
+            if newest < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+# -----------------------------------------------------------------------------
+# Background worker (submit + poll off the script thread)
+# -----------------------------------------------------------------------------
+def start_worker():
+    """Start the process-wide queue worker if it is not running yet."""
+    global _worker
+    with _owners_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_work, name="psc302-feedback-queue", daemon=True)
+            _worker.start()
+
+def watch(session_id: str, endpoint, cipher: Fernet):
+    """
+    Let the worker submit and poll this queue with an endpoint and cipher
+    captured on the script thread. Call on each rerun while work is waiting.
+    """
+    with _owners_lock:
+        entry = _owners.setdefault(session_id, {"polled": 0.0, "error": ""})
+        entry.update(endpoint=endpoint, cipher=cipher, seen=time.time())
+    start_worker()
+    _wake.set()
+
+def last_error(session_id: str) -> str:
+    """Most recent background submit/poll error for a queue ('' if none)."""
+    with _owners_lock:
+        return _owners.get(session_id, {}).get("error", "")
+
+def _work():
+    while True:
+        _wake.wait(timeout=WORKER_INTERVAL)
+        _wake.clear()
+        now = time.time()
+        with _owners_lock:
+            for session_id, entry in list(_owners.items()):
+                if now - entry["seen"] > OWNER_IDLE or not (BATCH_DIR / session_id).exists():
+                    del _owners[session_id]  # do not keep a student's key longer than needed
+            work = list(_owners.items())
+
+        for session_id, entry in work:
+            try:
+                flush(session_id, entry["endpoint"], entry["cipher"])
+                counts = status(session_id)
+                if counts["submitted"] and now - entry["polled"] >= POLL_INTERVAL:
+                    entry["polled"] = now
+                    poll(session_id, entry["endpoint"], entry["cipher"])
+                    counts = status(session_id)
+                entry["error"] = ""
+                if not (counts["queued"] or counts["submitted"]):
+                    with _owners_lock:
+                        _owners.pop(session_id, None)
+            except Exception as e:
+                entry["error"] = str(e)  # shown on the student's next rerun; retried next pass
+
+        try:
+            purge_expired()
+        except OSError:
+            pass  # retried after the next PURGE_INTERVAL
@@ -0,0 +1,317 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/chat_jobs.py — background chat requests for PSC 302 Streamlit Tutor
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Chat completions run on a shared, process-wide worker pool instead of inside
+# the Streamlit script run. The script only keeps a ChatJob handle in session
+# state, so reruns never reissue a request, the UI can poll streamed progress,
+# and a Stop button can abort the in-flight HTTP call.
+#
+# Admission control: at most CHAT_WORKERS upstream calls run at once. Waiting
+# jobs are queued per browser session and served round-robin across sessions,
+# so one student's burst cannot starve everyone else. When the queue is full,
+# or the estimated wait exceeds CHAT_SHED_WAIT, new jobs are shed immediately
+# ("try again shortly") rather than left to time out.
+#
+# Nothing in this module touches st.session_state: worker threads have no
+# script context. Everything a request needs (client, model, messages) is
+# captured by the caller on the script thread.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from utils import profiling
+
+CHAT_WORKERS = int(os.getenv("PSC302_CHAT_WORKERS", "16"))
+CHAT_MAX_QUEUED = int(os.getenv("PSC302_CHAT_MAX_QUEUED", "200"))
+CHAT_SHED_WAIT = float(os.getenv("PSC302_CHAT_SHED_WAIT", "60"))  # seconds; 0 disables
+
+
+# -----------------------------------------------------------------------------
+# Job handle
+# -----------------------------------------------------------------------------
+class ChatJob:
+    """
+    Handle for one in-flight chat turn.
+
+    Attributes
+    ----------
+    id : str
+        Unique request id.
+    turn_id : str
+        Fingerprint of (module, history position, prompt) used to reject
+        duplicate submissions of the same turn.
+    text : str
+        Reply text streamed so far.
+    status : str
+        'queued', 'running', 'done', 'cancelled', 'error' or 'shed'
+        (rejected by admission control).
+    prefix : str
+        Pre-built text the reply starts with (e.g. a cached opening scaffold);
+        the model only generates what follows it.
+    route : router.Route or None
+        Routing decision when the model was chosen automatically.
+    fallback : ChatJob or None
+        Finished job whose reply is kept if this one (an upgrade retry)
+        does not complete.
+    """
+
+    def __init__(self, turn_id: str, prompt: str, model: str, messages: List[Dict[str, str]],
+                 prefix: str = "", max_tokens: Optional[int] = None,
+                 profile_tag: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.turn_id = turn_id
+        self.prompt = prompt
+        self.model = model
+        self.messages = messages
+        self.prefix = prefix
+        self.max_tokens = max_tokens
+        self.profile_tag = profile_tag
+        self.route = None
+        self.fallback = None
+        self.text = prefix
+        self.status = "queued"
+        self.error = ""
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.session_id = ""
+        self._client = None
+        self._stream = None  # open response stream while running
+        self._temperature = 0.3
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def completion(self) -> str:
+        """The model-generated part of the reply (without the prefix)."""
+        return self.text[len(self.prefix):]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "cancelled", "error", "shed")
+
+    def cancel(self):
+        """Request cancellation; a queued job is dropped, a running one is aborted."""
+        self._cancel.set()
+        if _scheduler.cancel(self):
+            self._finish("cancelled")
+            return
+        # Closing the stream aborts a read that is waiting on the next chunk
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; False on timeout."""
+        return self._done.wait(timeout)
+
+    def queue_position(self) -> Optional[int]:
+        """1-based place in the admission queue, or None once running."""
+        return _scheduler.position(self)
+
+    def estimated_wait(self) -> float:
+        """Rough seconds until this queued job starts."""
+        pos = self.queue_position()
+        return _scheduler.estimated_wait(pos) if pos else 0.0
+
+    def _finish(self, status: str, error: str = ""):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+
+def turn_fingerprint(module_key: str, history_len: int, prompt: str) -> str:
+    """Stable id for a chat turn: same module, same position, same text."""
+    raw = f"{module_key}\x00{history_len}\x00{prompt.strip()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------------------------------------------------------------
+# Worker
+# -----------------------------------------------------------------------------
+def _run(job: ChatJob):
+    with profiling.profiled(job.profile_tag or "", on=job.profile_tag is not None):
+        _stream(job)
+
+def _stream(job: ChatJob):
+    try:
+        if job._cancel.is_set():  # cancelled just as a worker picked it up
+            job._finish("cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        extra = {"max_tokens": job.max_tokens} if job.max_tokens else {}
+        stream = job._client.chat.completions.create(
+            model=job.model,
+            messages=job.messages,
+            temperature=job._temperature,
+            stream=True,
+            **extra,
+        )
+        job._stream = stream
+        try:
+            if job._cancel.is_set():  # cancelled while the request was opening
+                job._finish("cancelled")
+                return
+            for chunk in stream:
+                if job._cancel.is_set():
+                    job._finish("cancelled")
+                    return
+                if chunk.choices and chunk.choices[0].delta.content:
+                    job.text += chunk.choices[0].delta.content
+        finally:
+            # Closing the stream drops the HTTP connection, so a cancelled
+            # request stops consuming upstream tokens immediately.
+            stream.close()
+        # A stream closed by cancel() may simply end early rather than raise
+        job._finish("cancelled" if job._cancel.is_set() else "done")
+    except Exception as e:
+        job._finish("cancelled" if job._cancel.is_set() else "error", str(e))
+    finally:
+        job._stream = None
+        job._client = None  # do not keep the student's key alive longer than needed
+
+
+# -----------------------------------------------------------------------------
+# Admission control: bounded workers, round-robin across sessions
+# -----------------------------------------------------------------------------
+class FairScheduler:
+    """
+    Bounded worker pool with one FIFO per session, served round-robin.
+
+    Parameters
+    ----------
+    workers : int
+        Maximum concurrent upstream calls.
+    max_queued : int
+        Jobs beyond this many waiting are shed.
+    shed_wait : float
+        Shed new jobs whose estimated wait exceeds this many seconds (0 = never).
+    """
+
+    def __init__(self, workers: int, max_queued: int, shed_wait: float):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.shed_wait = shed_wait
+        self._cond = threading.Condition()
+        self._queues: Dict[str, Deque[ChatJob]] = {}
+        self._ring: Deque[str] = deque()  # sessions with waiting jobs, in service order
+        self._queued = 0
+        self._running = 0
+        self._latency = 5.0  # EWMA of upstream call duration, seconds
+        self._threads: List[threading.Thread] = []
+
+    def _ensure_workers(self):
+        if not self._threads:
+            for i in range(self.workers):
+                t = threading.Thread(target=self._work, name=f"psc302-chat-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def estimated_wait(self, position: int) -> float:
+        """Seconds until the job at ``position`` gets a worker, from the latency EWMA."""
+        ahead = position - 1 + self._running
+        if ahead < self.workers:
+            return 0.0
+        return (ahead - self.workers + 1) / self.workers * self._latency
+
+    def submit(self, job: ChatJob) -> bool:
+        """Queue a job; False if it was shed."""
+        with self._cond:
+            self._ensure_workers()
+            q = self._queues.get(job.session_id)
+            if q:
+                position = len(q) * len(self._ring) + self._ring.index(job.session_id) + 1
+            else:
+                position = len(self._ring) + 1
+            if self._queued >= self.max_queued or (
+                self.shed_wait and self.estimated_wait(position) > self.shed_wait
+            ):
+                return False
+            if not q:
+                q = self._queues[job.session_id] = deque()
+                self._ring.append(job.session_id)
+            q.append(job)
+            self._queued += 1
+            self._cond.notify()
+        return True
+
+    def cancel(self, job: ChatJob) -> bool:
+        """Remove a still-waiting job; False if it already started."""
+        with self._cond:
+            q = self._queues.get(job.session_id)
+            if not q or job not in q:
+                return False
+            q.remove(job)
+            self._queued -= 1
+            if not q:
+                del self._queues[job.session_id]
+                self._ring.remove(job.session_id)
+            return True
+
+    def position(self, job: ChatJob) -> Optional[int]:
+        with self._cond:
+            q = self._queues.get(job.session_id)
+            if not q or job not in q:
+                return None
+            # Each earlier round serves one job from every waiting session
+            return q.index(job) * len(self._ring) + self._ring.index(job.session_id) + 1
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ring:
+                    self._cond.wait()
+                session_id = self._ring.popleft()
+                q = self._queues[session_id]
+                job = q.popleft()
+                self._queued -= 1
+                if q:
+                    self._ring.append(session_id)
+                else:
+                    del self._queues[session_id]
+                self._running += 1
+            try:
+                _run(job)
+            except Exception as e:
+                # Never let one job take its worker thread down with it
+                logging.getLogger(__name__).exception("chat job %s failed", job.id)
+                if not job.finished:
+                    job._client = None
+                    job._finish("error", str(e))
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    if job.status == "done" and job.started_at:
+                        self._latency = 0.8 * self._latency + 0.2 * (job.finished_at - job.started_at)
+
+
+_scheduler = FairScheduler(CHAT_WORKERS, CHAT_MAX_QUEUED, CHAT_SHED_WAIT)
+
+
+def submit(session_id: str, turn_id: str, prompt: str, client, model: str,
+           messages: List[Dict[str, str]], temperature: float = 0.3,
+           prefix: str = "", max_tokens: Optional[int] = None,
+           profile_tag: Optional[str] = None) -> ChatJob:
+    """Queue a chat request with admission control and return its handle."""
+    job = ChatJob(turn_id, prompt, model, list(messages), prefix=prefix, max_tokens=max_tokens,
+                  profile_tag=profile_tag)
+    job.session_id = session_id
+    job._client = client
+    job._temperature = temperature
+    if not _scheduler.submit(job):
+        job._client = None
+        job._finish("shed")
+    return job
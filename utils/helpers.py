@@ -2,11 +2,26 @@
 # utils/helpers.py — shared utility functions for PSC 302 Streamlit Tutor
 # ─────────────────────────────────────────────────────────────────────────────
 
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
 from typing import List, Dict
 import streamlit as st
+from cryptography.fernet import Fernet
 from openai import OpenAI
+
+# tiktoken reads its BPE files from TIKTOKEN_CACHE_DIR; point it at the
+# vendored copy so token counting never needs the network.
+os.environ.setdefault(
+    "TIKTOKEN_CACHE_DIR", str(Path(__file__).resolve().parent.parent / "tiktoken_cache")
+)
 import tiktoken
 
+from utils import batch_queue, chat_jobs, opening_cache, persistence, profiling, router
+
 # -----------------------------------------------------------------------------
 # Core system message and keyword triggers
 # -----------------------------------------------------------------------------
@@ -34,6 +49,63 @@ def ensure_session():
         st.session_state.model = "gpt-4o-mini"
     if "histories" not in st.session_state:
         st.session_state.histories = {}
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "resume_token" not in st.session_state:
+        # Reconnected or refreshed with ?resume=… : restore the log now,
+        # module histories lazily when each page opens
+        st.session_state.resume_token = st.query_params.get("resume", "")
+        if st.session_state.resume_token and "conversation_log" not in st.session_state:
+            log = persistence.get_store().load(st.session_state.resume_token, persistence.LOG_KEY)
+            if log:
+                st.session_state["conversation_log"] = log
+    elif st.session_state.resume_token and st.query_params.get("resume") != st.session_state.resume_token:
+        st.query_params["resume"] = st.session_state.resume_token  # keep it across page switches
+    warm_tokenizers()
+
+# -----------------------------------------------------------------------------
+# Reconnect-safe persistence (opt-in; see utils/persistence.py)
+# -----------------------------------------------------------------------------
+def enable_persistence():
+    """Opt in: issue a resume token and snapshot everything collected so far."""
+    ensure_session()
+    if not st.session_state.resume_token:
+        st.session_state.resume_token = persistence.new_token()
+        st.query_params["resume"] = st.session_state.resume_token
+        batch_queue.adopt(st.session_state.session_id, _session_cipher(),
+                          _feedback_owner(), _feedback_cipher())
+    for module_key in st.session_state.histories:
+        persist_session(module_key)
+    persist_session()
+
+def disable_persistence():
+    """Opt out: delete stored snapshots and drop the resume token."""
+    token = st.session_state.get("resume_token")
+    if token:
+        batch_queue.adopt(persistence.client_id(token), persistence.cipher(token),
+                          st.session_state.session_id, _session_cipher())
+        persistence.get_store().forget(token)
+    st.session_state.resume_token = ""
+    st.query_params.pop("resume", None)
+
+def persist_session(module_key: str = ""):
+    """Queue a write-behind snapshot of one module history (or just the log)."""
+    token = st.session_state.get("resume_token")
+    if not token:
+        return
+    store = persistence.get_store()
+    if module_key:
+        store.save(token, module_key, list(st.session_state.histories.get(module_key, [])))
+    store.save(token, persistence.LOG_KEY, list(st.session_state.get("conversation_log", [])))
+
+def _module_history(module_key: str) -> List[Dict[str, str]]:
+    """This module's history, restored from the snapshot store on first open."""
+    histories = st.session_state.histories
+    if module_key not in histories:
+        token = st.session_state.get("resume_token")
+        restored = persistence.get_store().load(token, module_key) if token else None
+        histories[module_key] = restored or []
+    return histories[module_key]
 
 # -----------------------------------------------------------------------------
 # API key management (safe per-session persistence)
@@ -66,48 +138,208 @@ def get_client() -> OpenAI | None:
 # -----------------------------------------------------------------------------
 # Utility: token counting
 # -----------------------------------------------------------------------------
-def token_len(text: str, model: str = "gpt-4o-mini") -> int:
-    """Count tokens for given text/model."""
+# Encodings used by the models offered on the home page
+TOKENIZER_ENCODINGS = ["o200k_base", "cl100k_base"]
+
+_encoders: Dict[str, "tiktoken.Encoding"] = {}
+_encoders_lock = threading.Lock()
+
+TIKTOKEN_BLOB_URL = "https://openaipublic.blob.core.windows.net/encodings/{name}.tiktoken"
+
+def _cached_bpe(name: str) -> Path:
+    """Where tiktoken looks for an encoding's BPE file (sha1 of its download URL)."""
+    key = hashlib.sha1(TIKTOKEN_BLOB_URL.format(name=name).encode()).hexdigest()
+    return Path(os.environ["TIKTOKEN_CACHE_DIR"]) / key
+
+def _load_encoders():
+    for name in TOKENIZER_ENCODINGS:
+        # get_encoding would silently download a missing file; stay offline instead
+        if not _cached_bpe(name).exists():
+            logging.getLogger(__name__).warning(
+                "tiktoken encoding %s is not in %s; token counts use the ~4 chars/token "
+                "estimate. Run scripts/fetch_tiktoken_cache.py to vendor it.",
+                name, os.environ["TIKTOKEN_CACHE_DIR"],
+            )
+            continue
+        try:
+            enc = tiktoken.get_encoding(name)
+        except Exception:
+            continue  # unreadable cache file; token_len falls back to an estimate
+        with _encoders_lock:
+            _encoders[name] = enc
+
+@st.cache_resource(show_spinner=False)
+def warm_tokenizers() -> threading.Thread:
+    """Load tiktoken encodings once per process, off the request path."""
+    t = threading.Thread(target=_load_encoders, name="psc302-tiktoken-warmup", daemon=True)
+    t.start()
+    return t
+
+def _encoder(model: str):
+    """Cached encoder for a model, or None if it is not loaded yet."""
     try:
-        enc = tiktoken.encoding_for_model(model)
+        name = tiktoken.encoding_name_for_model(model)
     except Exception:
-        enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
+        name = "cl100k_base"
+    with _encoders_lock:
+        return _encoders.get(name) or _encoders.get("cl100k_base")
+
+def token_len(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count tokens for given text/model (≈4 chars/token until encoders are warm)."""
+    enc = _encoder(model)
+    if enc is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(enc.encode_ordinary(text))
+
+def token_len_many(texts: List[str], model: str = "gpt-4o-mini") -> List[int]:
+    """Count tokens for many texts at once (e.g. a whole chat history)."""
+    enc = _encoder(model)
+    if enc is None:
+        return [max(1, len(t) // 4) if t else 0 for t in texts]
+    return [len(ids) for ids in enc.encode_ordinary_batch(texts)]
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("PSC302_HISTORY_TOKENS", "12000"))
+
+def fit_history(history: List[Dict[str, str]], model: str,
+                budget: int = HISTORY_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """Most recent turns of ``history`` whose contents fit in ``budget`` tokens."""
+    sizes = token_len_many([m["content"] for m in history], model)
+    kept, total = len(history), 0
+    while kept and total + sizes[kept - 1] <= budget:
+        kept -= 1
+        total += sizes[kept]
+    # Start on a user turn so the model never sees a reply without its question
+    while kept < len(history) and history[kept]["role"] != "user":
+        kept += 1
+    return history[kept:]
 
 # -----------------------------------------------------------------------------
 # Core chat function
 # -----------------------------------------------------------------------------
+BUSY_MESSAGE = "⏳ The tutor is very busy right now. Please try again shortly."
+
+def show_chat_error(err: str):
+    """Render an OpenAI error message, with a clearer hint for bad keys."""
+    if "401" in err or "invalid_api_key" in err.lower():
+        st.error("❌ Your OpenAI API key appears invalid or expired. Please check and re-enter it on the home page.")
+    else:
+        st.error(f"OpenAI error: {err}")
+
+def resolve_model() -> str:
+    """Session model choice; "Auto" falls back to the fast model outside the chat UI."""
+    model = st.session_state.get("model", "gpt-4o-mini")
+    return router.FAST_MODEL if model == router.AUTO_MODEL else model
+
 def send_chat(messages: List[Dict[str, str]], temperature: float = 0.3) -> str:
     """Send a chat completion request to OpenAI safely."""
     client = get_client()
     if client is None:
         return ""
 
-    model = st.session_state.get("model", "gpt-4o-mini")
-
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature
-        )
-        return resp.choices[0].message.content
+    model = resolve_model()
+    ensure_session()
 
-    except Exception as e:
-        if "401" in str(e) or "invalid_api_key" in str(e).lower():
-            st.error("❌ Your OpenAI API key appears invalid or expired. Please check and re-enter it on the home page.")
-        else:
-            st.error(f"OpenAI error: {e}")
+    # Goes through the same admission-controlled pool as the module chat
+    job = chat_jobs.submit(
+        st.session_state.session_id, uuid.uuid4().hex, "", client,
+        model=model, messages=messages, temperature=temperature,
+        profile_tag=f"send_chat_{model}" if profiling.enabled() else None,
+    )
+    with st.spinner("Waiting for the tutor…"):
+        job.wait()
+    if job.status == "shed":
+        st.warning(BUSY_MESSAGE)
+        return ""
+    if job.status != "done":
+        show_chat_error(job.error or "empty reply")
         return ""
+    return job.text
 
 # ----------------------------------------------------------------------------- 
 # Chat interface for each module (auto-logging only)
 # -----------------------------------------------------------------------------
 from datetime import datetime
 
+def _dispatch_chat(module_key: str, turn_id: str, prompt: str, messages: List[Dict[str, str]],
+                   client, history_len: int) -> chat_jobs.ChatJob:
+    """Submit a turn, resolving the "Auto" model choice per turn."""
+    model = st.session_state.get("model", "gpt-4o-mini")
+    decision = None
+    if model == router.AUTO_MODEL:
+        decision = router.route(prompt, module_key, history_len, token_len(prompt))
+        model = decision.model
+
+    profile_tag = f"chat_{module_key}_{model}" if profiling.enabled() else None
+
+    # First turn in a module: show the cached scaffold at once and only
+    # generate a short personalized completion after it
+    scaffold = opening_cache.get_scaffold(module_key, model) if history_len == 0 else None
+    if scaffold:
+        job = chat_jobs.submit(
+            st.session_state.session_id, turn_id, prompt, client, model=model,
+            messages=opening_cache.opening_messages(SYSTEM_CORE, scaffold, prompt),
+            prefix=scaffold + "\n\n",
+            max_tokens=opening_cache.COMPLETION_MAX_TOKENS,
+            profile_tag=profile_tag,
+        )
+    else:
+        job = chat_jobs.submit(st.session_state.session_id, turn_id, prompt, client,
+                               model=model, messages=messages, profile_tag=profile_tag)
+    job.route = decision
+    return job
+
+def _commit_chat_job(module_key: str, history: List[Dict[str, str]], job: chat_jobs.ChatJob):
+    """Apply a finished job: append the turn on success, otherwise roll it back."""
+    started, ended = (job.fallback or job).submitted_at, job.finished_at
+    if job.fallback is not None and not (job.status == "done" and job.completion):
+        # The upgrade retry was shed, failed or stopped: keep the fast reply already received
+        job = job.fallback
+    if job.route is not None and job.status == "done":
+        # End-to-end: an upgraded turn counts once, including its fast attempt
+        router.record(job.model, ended - started, upgraded=job.route.reason == "upgrade")
+
+    if job.status == "done" and job.completion:
+        history.append({"role": "user", "content": job.prompt})
+        history.append({"role": "assistant", "content": job.text})
+
+        # ✅ Auto-log prompt + reply in conversation_log
+        if "conversation_log" not in st.session_state:
+            st.session_state["conversation_log"] = []
+        st.session_state["conversation_log"].append({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "module": module_key,
+            "prompt": job.prompt,
+            "response": job.text,
+            "type": "interaction",
+        })
+        persist_session(module_key)
+    elif job.status == "cancelled":
+        st.info("⏹️ Stopped. That message was discarded; you can edit and resend it.")
+    elif job.status == "shed":
+        st.warning(BUSY_MESSAGE)
+    else:
+        show_chat_error(job.error or "empty reply")
+
+@st.fragment(run_every=0.5)
+def _chat_job_progress(job: chat_jobs.ChatJob):
+    """Poll an in-flight job, streaming its partial reply until it finishes."""
+    if job.finished:
+        st.rerun()
+    with st.chat_message("assistant"):
+        position = job.queue_position()
+        if position:
+            wait = job.estimated_wait()
+            eta = f" (about {wait:.0f}s)" if wait >= 1 else ""
+            st.markdown(f"_Many students are asking right now: you are #{position} in line{eta}…_")
+        else:
+            st.markdown(job.text or "_Thinking…_")
+        st.button("⏹️ Stop", key=f"stop_{job.id}", on_click=job.cancel)
+
 def module_chat_ui(module_key: str, prompt_hint: str, starter: str = ""):
     """Display module chat UI and record each exchange in conversation_log."""
-    history = st.session_state.histories.setdefault(module_key, [])
+    process_feedback_queue()
+    history = _module_history(module_key)
+    jobs = st.session_state.setdefault("chat_jobs", {})
 
     # -------------------------------------------------------------------------
     # 1. Show starter text (Goal / Coach prompts) ABOVE the dialogue section
@@ -119,40 +351,146 @@ def module_chat_ui(module_key: str, prompt_hint: str, starter: str = ""):
     st.subheader("Your Dialogue")
 
     # -------------------------------------------------------------------------
-    # 2. Display conversation so far
+    # 2. Apply a finished background request, then display conversation so far
     # -------------------------------------------------------------------------
+    job = jobs.get(module_key)
+    if job is not None and job.finished:
+        del jobs[module_key]
+        client = get_client() if job.route is not None else None
+        if client is not None and job.status == "done" and router.should_upgrade(job.route, job.completion):
+            # Borderline turn got a weak fast-model reply: retry once on the strong model
+            upgraded = chat_jobs.submit(job.session_id, job.turn_id, job.prompt, client,
+                                        model=router.STRONG_MODEL, messages=job.messages,
+                                        prefix=job.prefix, max_tokens=job.max_tokens,
+                                        profile_tag=job.profile_tag)
+            upgraded.route = job.route._replace(model=router.STRONG_MODEL, borderline=False,
+                                                reason="upgrade")
+            upgraded.fallback = job
+            jobs[module_key] = upgraded
+            job = upgraded
+        else:
+            _commit_chat_job(module_key, history, job)
+            job = None
+
     for msg in history:
         st.chat_message(msg["role"]).markdown(msg["content"])
 
     # -------------------------------------------------------------------------
-    # 3. Handle new user input and AI reply
+    # 3. Handle new user input (dispatched to the shared worker pool)
     # -------------------------------------------------------------------------
     u = st.chat_input(prompt_hint)
     if u:
-        st.chat_message("user").markdown(u)
-        history.append({"role": "user", "content": u})
-
-        messages = [{"role": "system", "content": SYSTEM_CORE}] + history
-        reply = send_chat(messages)
-
-        if reply:
-            st.chat_message("assistant").markdown(reply)
-            history.append({"role": "assistant", "content": reply})
-
-            # ✅ Auto-log prompt + reply in conversation_log
-            if "conversation_log" not in st.session_state:
-                st.session_state["conversation_log"] = []
-            st.session_state["conversation_log"].append({
-                "timestamp": datetime.now().isoformat(timespec="seconds"),
-                "module": module_key,
-                "prompt": u,
-                "response": reply,
-                "type": "interaction",
-            })
+        turn_id = chat_jobs.turn_fingerprint(module_key, len(history), u)
+        if job is not None:
+            # Double Enter on the same turn is silently ignored
+            if job.turn_id != turn_id:
+                st.warning("Please wait for the current reply (or press Stop) before sending another message.")
+        else:
+            client = get_client()
+            if client is not None:
+                # Oldest turns are dropped once a long dialogue outgrows the budget
+                budget = HISTORY_TOKEN_BUDGET - token_len(SYSTEM_CORE + u, resolve_model())
+                messages = [{"role": "system", "content": SYSTEM_CORE}]
+                messages += fit_history(history, resolve_model(), budget)
+                messages.append({"role": "user", "content": u})
+                job = _dispatch_chat(module_key, turn_id, u, messages, client, len(history))
+                jobs[module_key] = job
+
+    # -------------------------------------------------------------------------
+    # 4. Show the pending turn; it joins history only once a reply arrives
+    # -------------------------------------------------------------------------
+    if job is not None:
+        st.chat_message("user").markdown(job.prompt)
+        _chat_job_progress(job)
 
     st.session_state.histories[module_key] = history
 
 
+# -----------------------------------------------------------------------------
+# Deferred feedback ("get feedback later" via the batch queue)
+# -----------------------------------------------------------------------------
+def _feedback_owner() -> str:
+    """Queue owner: the resume-token id if persistence is on, else the session id."""
+    token = st.session_state.get("resume_token")
+    return persistence.client_id(token) if token else st.session_state.session_id
+
+def _session_cipher() -> Fernet:
+    """Random key that lives only in this browser session."""
+    if "feedback_key" not in st.session_state:
+        st.session_state.feedback_key = Fernet.generate_key()
+    return Fernet(st.session_state.feedback_key)
+
+def _feedback_cipher() -> Fernet:
+    """Key that seals queued feedback: from the resume token if persistence is on."""
+    token = st.session_state.get("resume_token")
+    return persistence.cipher(token) if token else _session_cipher()
+
+def queue_feedback(module_key: str, prompt: str, instructions: str) -> str:
+    """
+    Queue a non-interactive feedback request instead of calling send_chat.
+
+    The request is answered in bulk by the batch endpoint; the reply is
+    delivered into conversation_log by process_feedback_queue on a later rerun.
+    """
+    ensure_session()
+    messages = [
+        {"role": "system", "content": SYSTEM_CORE + " " + instructions},
+        {"role": "user", "content": prompt},
+    ]
+    return batch_queue.enqueue(
+        _feedback_owner(),
+        _feedback_cipher(),
+        module_key,
+        prompt,
+        messages,
+        model=resolve_model(),
+    )
+
+def process_feedback_queue():
+    """
+    Hand this student's queue to the background worker and deliver finished
+    results. Only local files are read here; no network call is made.
+    """
+    ensure_session()
+    batch_queue.start_worker()
+    owner, cipher = _feedback_owner(), _feedback_cipher()
+    counts = batch_queue.status(owner)
+
+    if counts["queued"] or counts["submitted"]:
+        # Captured on the script thread, like chat_jobs: the worker has no session state
+        key = get_api_key()
+        endpoint = batch_queue.get_endpoint(OpenAI(api_key=key) if key else None)
+        if endpoint is not None:
+            batch_queue.watch(owner, endpoint, cipher)
+        error = batch_queue.last_error(owner)
+        if error:
+            st.error(f"Feedback queue error: {error}")
+
+    # Deliver anything the worker collected, including results that arrived
+    # while the student was away (e.g. before a reconnect with their resume link)
+    results = batch_queue.undelivered(owner, cipher)
+    for result in results:
+        log_interaction(result["module"], result["prompt"], result["response"],
+                        note_type="deferred_feedback")
+    batch_queue.mark_delivered(owner, [r["custom_id"] for r in results])
+
+def render_deferred_feedback(module_key: str):
+    """Show queued-feedback status and any feedback already delivered for a module."""
+    process_feedback_queue()
+    counts = batch_queue.status(_feedback_owner())
+    waiting = counts["queued"] + counts["submitted"]
+    if waiting:
+        st.caption(f"📬 {waiting} feedback request(s) waiting; results appear here when ready.")
+
+    delivered = [
+        e for e in st.session_state.get("conversation_log", [])
+        if e["type"] == "deferred_feedback" and e["module"] == module_key
+    ]
+    for entry in delivered:
+        with st.expander(f"Feedback ({entry['timestamp']})"):
+            st.markdown(entry["response"])
+
+
 # -----------------------------------------------------------------------------
 # Page helpers
 # -----------------------------------------------------------------------------
@@ -201,3 +539,4 @@ def log_interaction(module: str, prompt: str, response: str = "", note_type: str
         "prompt": prompt,
         "response": response,
     })
+    persist_session()
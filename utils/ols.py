@@ -0,0 +1,186 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/ols.py — least-squares engine for the Regression Logic module
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Fits use a thin QR factorization of the design matrix, X = QR. The
+# factorization depends only on the regressors, so it is cached and reused:
+#   - switching the dependent variable is one projection, Qᵀy (no refactoring);
+#   - adding one control appends one column to Q and R (Gram–Schmidt step)
+#     instead of refactoring the whole design.
+# batched_ols fits many small regressions at once for simulation demos.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy import linalg
+from scipy import stats as sps
+
+
+# -----------------------------------------------------------------------------
+# QR-factored design matrix
+# -----------------------------------------------------------------------------
+class QRDesign:
+    """Thin QR factorization of a design matrix, reusable across outcomes."""
+
+    def __init__(self, Q: np.ndarray, R: np.ndarray, names: List[str]):
+        self.Q = Q
+        self.R = R
+        self.names = names
+
+    @classmethod
+    def from_matrix(cls, X: np.ndarray, names: Sequence[str]) -> "QRDesign":
+        X = np.asarray(X, dtype=float)
+        Q, R = np.linalg.qr(X, mode="reduced")
+        # Same tolerance as add_column: a tiny |R_jj| means column j is
+        # (numerically) a combination of the columns before it
+        norms = np.linalg.norm(X, axis=0)
+        for j, name in enumerate(names):
+            if abs(R[j, j]) <= 1e-10 * max(norms[j], 1.0):
+                raise ValueError(f"'{name}' is collinear with the existing regressors")
+        return cls(Q, R, list(names))
+
+    @property
+    def n(self) -> int:
+        return self.Q.shape[0]
+
+    @property
+    def k(self) -> int:
+        return self.Q.shape[1]
+
+    def add_column(self, x: np.ndarray, name: str) -> "QRDesign":
+        """Return the factorization of [X, x] by extending Q and R by one column."""
+        x = np.asarray(x, dtype=float)
+        r = self.Q.T @ x
+        q = x - self.Q @ r
+        # Second pass ("twice is enough") keeps Q orthogonal in floating point
+        r2 = self.Q.T @ q
+        q -= self.Q @ r2
+        r += r2
+        rho = np.linalg.norm(q)
+        if rho <= 1e-10 * max(np.linalg.norm(x), 1.0):
+            raise ValueError(f"'{name}' is collinear with the existing regressors")
+        R = np.zeros((self.k + 1, self.k + 1))
+        R[:-1, :-1] = self.R
+        R[:-1, -1] = r
+        R[-1, -1] = rho
+        return QRDesign(np.column_stack([self.Q, q / rho]), R, self.names + [name])
+
+    def fit(self, y: np.ndarray) -> Dict:
+        """
+        OLS fit of y on the design.
+
+        Returns
+        -------
+        dict
+            ``coef``, ``se``, ``t``, ``p`` (arrays aligned with ``names``),
+            plus ``r2``, ``n``, ``df_resid`` and ``names``.
+        """
+        y = np.asarray(y, dtype=float)
+        qty = self.Q.T @ y
+        coef = linalg.solve_triangular(self.R, qty)
+        resid = y - self.Q @ qty
+        rss = float(resid @ resid)
+        df_resid = self.n - self.k
+        sigma2 = max(rss, 0.0) / df_resid
+        # diag((XᵀX)⁻¹) = row sums of R⁻¹ squared
+        r_inv = linalg.solve_triangular(self.R, np.eye(self.k))
+        se = np.sqrt(sigma2 * (r_inv ** 2).sum(axis=1))
+        t = coef / se
+        tss = float(((y - y.mean()) ** 2).sum())
+        return {
+            "names": self.names,
+            "coef": coef,
+            "se": se,
+            "t": t,
+            "p": 2 * sps.t.sf(np.abs(t), df_resid),
+            "r2": 1 - rss / tss if tss > 0 else float("nan"),
+            "n": self.n,
+            "df_resid": df_resid,
+        }
+
+
+class DesignCache:
+    """
+    Small LRU of QRDesign objects keyed by (dataset key, regressor names).
+
+    A request for regressors (a, b, c) reuses a cached (a, b) factorization
+    and appends c, so adding controls one at a time never refactors.
+    Thread-safe, so one instance can be shared by every session.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, QRDesign]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, data_key: str, names: Sequence[str],
+            column: Callable[[str], np.ndarray]) -> QRDesign:
+        """Return the design for ``names``; ``column(name)`` supplies raw columns."""
+        names = tuple(names)
+        key = (data_key, names)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            # Longest cached prefix of the requested regressors
+            design, cut = None, len(names)
+            for c in range(len(names) - 1, 0, -1):
+                prefix = self._entries.get((data_key, names[:c]))
+                if prefix is not None:
+                    design, cut = prefix, c
+                    break
+
+        # Factor outside the lock; QRDesign objects are never mutated
+        if design is None:
+            design = QRDesign.from_matrix(np.column_stack([column(n) for n in names]), names)
+        for name in names[cut:]:
+            design = design.add_column(column(name), name)
+
+        with self._lock:
+            self._entries[key] = design
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return design
+
+
+# -----------------------------------------------------------------------------
+# Batched OLS (many small regressions in one call)
+# -----------------------------------------------------------------------------
+def batched_ols(X: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Fit S independent regressions at once.
+
+    Parameters
+    ----------
+    X : array, shape (S, n, k)
+    y : array, shape (S, n)
+
+    Returns
+    -------
+    array, shape (S, k) of coefficients.
+    """
+    XtX = np.einsum("snk,snj->skj", X, X)
+    Xty = np.einsum("snk,sn->sk", X, y)
+    return np.linalg.solve(XtX, Xty[..., None])[..., 0]
+
+def simulate_ovb(n_specs: int, n: int, beta_x: float, beta_z: float,
+                 rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Omitted variable bias demo across many simulated specifications.
+
+    Each specification draws a different correlation ρ between x and the
+    confounder z, generates y = beta_x·x + beta_z·z + e, and fits both the
+    short regression (y on x) and the long one (y on x and z).
+    """
+    rho = rng.uniform(-0.9, 0.9, size=n_specs)
+    z = rng.standard_normal((n_specs, n))
+    x = rho[:, None] * z + np.sqrt(1 - rho[:, None] ** 2) * rng.standard_normal((n_specs, n))
+    y = beta_x * x + beta_z * z + rng.standard_normal((n_specs, n))
+    ones = np.ones_like(x)
+    short = batched_ols(np.stack([ones, x], axis=-1), y)[:, 1]
+    long = batched_ols(np.stack([ones, x, z], axis=-1), y)[:, 1]
+    return {"rho": rho, "short": short, "long": long}
@@ -0,0 +1,55 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/opening_cache.py — pre-built opening replies for each module
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# A student's first message in a module mostly gets the same coaching
+# scaffold (the probing questions from the module starter). Those scaffolds
+# are generated ahead of time by scripts/build_opening_cache.py and stored in
+# data/opening_templates.json as {module: {model: scaffold}}, with a "default"
+# entry used for any model that has no scaffold of its own.
+#
+# On the first turn the scaffold is shown immediately and the model is asked
+# only for a short personalized completion, instead of a full cold reply.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TEMPLATE_PATH = Path(os.getenv(
+    "PSC302_OPENING_TEMPLATES",
+    Path(__file__).resolve().parent.parent / "data" / "opening_templates.json",
+))
+
+# Cap for the personalized completion appended to a scaffold
+COMPLETION_MAX_TOKENS = 160
+
+
+@lru_cache(maxsize=1)
+def load_templates() -> Dict[str, Dict[str, str]]:
+    """Read the template file once per process (empty if it is missing)."""
+    if not TEMPLATE_PATH.exists():
+        return {}
+    with TEMPLATE_PATH.open(encoding="utf-8") as f:
+        return json.load(f)
+
+def get_scaffold(module_key: str, model: str) -> Optional[str]:
+    """Scaffold for a module/model pair, falling back to the module default."""
+    entry = load_templates().get(module_key, {})
+    return entry.get(model) or entry.get("default")
+
+def opening_messages(system: str, scaffold: str, prompt: str) -> List[Dict[str, str]]:
+    """Messages asking only for the personalized part of a first reply."""
+    return [
+        {"role": "system", "content": system},
+        {"role": "system", "content": (
+            "The student has already been shown this opening from you:\n\n"
+            f"{scaffold}\n\n"
+            "Continue directly after it. In 2–4 sentences, respond to the specifics of "
+            "the student's message and end with one probing question tailored to it. "
+            "Do not repeat the opening."
+        )},
+        {"role": "user", "content": prompt},
+    ]
@@ -0,0 +1,196 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/persistence.py — opt-in, reconnect-safe session snapshots
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Students who opt in get a random resume token kept in their URL (?resume=…).
+# Module histories and the conversation log are snapshotted into a local
+# SQLite (WAL) database so a dropped websocket or a refresh does not wipe them.
+#
+#   - Client-keyed: rows are keyed by a hash of the token, and payloads are
+#     encrypted (Fernet) with a key derived from the token plus an optional
+#     server secret. The token itself is never stored, so the server cannot
+#     read a snapshot without the student's URL.
+#   - Write-behind: save() only drops the latest snapshot into an in-memory
+#     buffer; a background thread serializes, encrypts and writes batches in
+#     one transaction. Chat turns never wait on disk.
+#   - Lazy restore: each module's history is loaded only when that page opens.
+#   - TTL: snapshots older than SESSION_TTL_DAYS are purged.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import base64
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from cryptography.fernet import Fernet, InvalidToken
+
+SESSION_DB = Path(os.getenv("PSC302_SESSION_DB", ".sessions/sessions.db"))
+SESSION_SECRET = os.getenv("PSC302_SESSION_SECRET", "")
+SESSION_TTL_DAYS = float(os.getenv("PSC302_SESSION_TTL_DAYS", "14"))
+FLUSH_INTERVAL = 2.0  # seconds between write-behind batches
+PURGE_INTERVAL = 3600.0  # seconds between TTL purges
+
+LOG_KEY = "__conversation_log__"
+
+
+# -----------------------------------------------------------------------------
+# Keys
+# -----------------------------------------------------------------------------
+def new_token() -> str:
+    """Random resume token for a student who opts in."""
+    return secrets.token_urlsafe(24)
+
+def client_id(token: str) -> str:
+    """Stable, non-reversible id for a resume token (safe to use as a key or path)."""
+    return hashlib.sha256(b"id\x00" + token.encode()).hexdigest()
+
+def cipher(token: str) -> Fernet:
+    """Fernet cipher for data owned by a resume token."""
+    raw = hashlib.sha256(b"key\x00" + SESSION_SECRET.encode() + b"\x00" + token.encode()).digest()
+    return Fernet(base64.urlsafe_b64encode(raw))
+
+
+# -----------------------------------------------------------------------------
+# SQLite store with a write-behind thread
+# -----------------------------------------------------------------------------
+class SnapshotStore:
+    """SQLite (WAL) snapshot table fed by a background write-behind thread."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._pending: Dict[Tuple[str, str], Tuple[str, object, float]] = {}
+        self._forgotten: Set[str] = set()  # client ids to delete on the next flush
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one batch in flight at a time
+        self._wake = threading.Event()
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                " client TEXT NOT NULL, module TEXT NOT NULL, payload BLOB NOT NULL,"
+                " updated_at REAL NOT NULL, PRIMARY KEY (client, module))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS snapshots_updated ON snapshots (updated_at)")
+        threading.Thread(target=self._writer, name="psc302-session-writer", daemon=True).start()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- write path (non-blocking) -------------------------------------------
+    def save(self, token: str, module: str, data):
+        """Buffer the latest snapshot; later saves of the same key replace it."""
+        with self._lock:
+            self._pending[(client_id(token), module)] = (token, data, time.time())
+        self._wake.set()
+
+    def _writer(self):
+        while True:
+            self._wake.wait(timeout=PURGE_INTERVAL)
+            time.sleep(FLUSH_INTERVAL)  # let a burst of saves coalesce
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.time() - self._last_purge >= PURGE_INTERVAL:
+                    self.purge_expired()
+            except Exception:
+                time.sleep(FLUSH_INTERVAL)  # keep the writer alive; retry next round
+
+    def flush(self):
+        """
+        Apply pending deletions, then encrypt and write all buffered snapshots,
+        in one transaction. A failed batch is put back for the next round.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                forgotten, self._forgotten = self._forgotten, set()
+            if not (batch or forgotten):
+                return
+            rows = []
+            for (client, module), (token, data, ts) in batch.items():
+                try:
+                    rows.append((client, module, cipher(token).encrypt(json.dumps(data).encode()), ts))
+                except Exception:
+                    continue  # unserializable snapshot: retrying would fail the same way
+            try:
+                with self._conn() as conn:
+                    conn.executemany("DELETE FROM snapshots WHERE client = ?",
+                                     [(client,) for client in forgotten])
+                    conn.executemany(
+                        "INSERT INTO snapshots (client, module, payload, updated_at) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (client, module) DO UPDATE SET payload=excluded.payload, updated_at=excluded.updated_at",
+                        rows,
+                    )
+            except Exception:
+                with self._lock:
+                    # Saves made since the swap are newer and win over the failed batch
+                    for key, value in batch.items():
+                        if key[0] not in self._forgotten:
+                            self._pending.setdefault(key, value)
+                    self._forgotten |= forgotten
+                raise
+
+    def purge_expired(self):
+        self._last_purge = time.time()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM snapshots WHERE updated_at < ?",
+                         (time.time() - SESSION_TTL_DAYS * 86400,))
+
+    # --- read path -------------------------------------------------------------
+    def load(self, token: str, module: str):
+        """Latest snapshot for (token, module), or None if absent/expired/unreadable."""
+        key = (client_id(token), module)
+        with self._lock:
+            if key in self._pending:  # not yet flushed
+                return self._pending[key][1]
+            if key[0] in self._forgotten:  # deletion not yet flushed
+                return None
+        row = self._conn().execute(
+            "SELECT payload, updated_at FROM snapshots WHERE client = ? AND module = ?", key
+        ).fetchone()
+        if row is None or row[1] < time.time() - SESSION_TTL_DAYS * 86400:
+            return None
+        try:
+            return json.loads(cipher(token).decrypt(row[0]))
+        except InvalidToken:
+            return None
+
+    def forget(self, token: str):
+        """
+        Delete every snapshot for a token (student opted out).
+
+        The DELETE runs on the next flush, after any batch already in flight,
+        so a snapshot being written right now cannot reappear afterwards.
+        """
+        client = client_id(token)
+        with self._lock:
+            self._pending = {k: v for k, v in self._pending.items() if k[0] != client}
+            self._forgotten.add(client)
+        self._wake.set()
+
+
+_store: Optional[SnapshotStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> SnapshotStore:
+    """Process-wide snapshot store (created on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore(SESSION_DB)
+        return _store
@@ -0,0 +1,127 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/profiling.py — opt-in cProfile hooks for page reruns and chat calls
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Off by default. Turn on for the whole server with PSC302_PROFILE=1, or for
+# one browser session by opening any page with ?profile=1 in the URL.
+#
+# When enabled, each page rerun (start_page_profile / finish_page_profile) and
+# each upstream chat call (profiled) is recorded with cProfile and dumped as a
+# .pstats file tagged with the page and module into PROFILE_DIR, keeping only
+# the newest PROFILE_KEEP files. When disabled, the hooks return immediately.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import streamlit as st
+
+PROFILE_ALWAYS = os.getenv("PSC302_PROFILE", "") == "1"
+PROFILE_DIR = Path(os.getenv("PSC302_PROFILE_DIR", ".profiles"))
+PROFILE_KEEP = int(os.getenv("PSC302_PROFILE_KEEP", "50"))
+
+_dump_lock = threading.Lock()
+_active = threading.local()  # cProfile allows one profiler per thread
+
+
+def enabled() -> bool:
+    """True if profiling is on for this server or this session (?profile=1)."""
+    return PROFILE_ALWAYS or st.query_params.get("profile") == "1"
+
+
+# -----------------------------------------------------------------------------
+# Dumping + rotation
+# -----------------------------------------------------------------------------
+def _dump(prof: cProfile.Profile, tag: str) -> Optional[Path]:
+    """Best-effort: a full disk or unwritable PROFILE_DIR only loses this profile."""
+    safe = re.sub(r"[^A-Za-z0-9_-]+", "-", tag).strip("-")
+    path = PROFILE_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}_{safe}.pstats"
+    try:
+        with _dump_lock:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            prof.dump_stats(path)
+            for old in sorted(PROFILE_DIR.glob("*.pstats"))[:-PROFILE_KEEP]:
+                old.unlink(missing_ok=True)
+    except OSError as e:
+        logging.getLogger(__name__).warning("could not write profile %s: %s", path, e)
+        return None
+    return path
+
+
+@contextmanager
+def profiled(tag: str, on: bool = True):
+    """
+    Profile the enclosed block and dump it under ``tag``.
+
+    ``on`` must be decided on the script thread (see enabled()); worker
+    threads cannot read query params. Nested use in the same thread is a
+    no-op because the outer profile already covers the block.
+    """
+    if not on or getattr(_active, "prof", None) is not None:
+        yield
+        return
+    prof = cProfile.Profile()
+    _active.prof = prof
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        _active.prof = None
+        _dump(prof, tag)
+
+
+# -----------------------------------------------------------------------------
+# Page reruns
+# -----------------------------------------------------------------------------
+def start_page_profile(page: str, module_key: str = "") -> Optional[dict]:
+    """
+    Start profiling this script run; returns None when profiling is off.
+
+    A run cut short by st.rerun()/st.stop() never reaches finish_page_profile,
+    so a page profile still active on this thread is stale: it is discarded
+    here rather than left installed.
+    """
+    stale = getattr(_active, "page_run", None)
+    if stale is not None:
+        stale["prof"].disable()
+        _active.prof = _active.page_run = None
+    if not enabled() or getattr(_active, "prof", None) is not None:
+        return None
+    prof = cProfile.Profile()
+    _active.prof = prof
+    prof.enable()
+    _active.page_run = {"prof": prof, "tag": f"page_{page}_{module_key}" if module_key else f"page_{page}"}
+    return _active.page_run
+
+def finish_page_profile(run: Optional[dict]):
+    """Stop and dump a page profile, then show its hottest functions in the sidebar."""
+    if run is None:
+        return
+    run["prof"].disable()
+    _active.prof = _active.page_run = None
+    path = _dump(run["prof"], run["tag"])
+    if path is not None:
+        st.session_state["last_profile"] = str(path)
+    render_profile_sidebar()
+
+def render_profile_sidebar(limit: int = 15):
+    """Sidebar expander listing the hottest functions of the last profiled rerun."""
+    path = st.session_state.get("last_profile")
+    if not path or not Path(path).exists():
+        return
+    out = io.StringIO()
+    pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+    with st.sidebar.expander("⏱️ Profile of last rerun"):
+        st.caption(Path(path).name)
+        st.code(out.getvalue(), language=None)
+        st.download_button("Download .pstats", Path(path).read_bytes(), file_name=Path(path).name)
@@ -34,4 +34,53 @@ INTRO_WR = (
 
 INTRO_REFLECT = (
 "Reflection: In 3–5 bullets, describe how the AI tutor improved your understanding. Include one verification step you took."
-)
\ No newline at end of file
+)
+
+
+# -----------------------------------------------------------------------------
+# Module starters (Goal / Coach prompts shown above each dialogue)
+# -----------------------------------------------------------------------------
+STARTER_SM = (
+"**Goal:** Articulate a political phenomenon, a theory, and a testable implication.\n\n"
+"**Coach promises:** I’ll ask for clarity on mechanisms, scope conditions, and falsifiability."
+)
+
+
+STARTER_HYP = (
+"**Goal:** Draft a precise, directional, falsifiable hypothesis.\n\n"
+"**Coach prompts:** Identify IV→DV direction, mechanism, and rival explanations."
+)
+
+
+STARTER_VM = (
+"**Goal:** Define IV and DV and propose concrete measurements.\n\n"
+"**Coach prompts:** Levels of measurement, reliability, validity, bias, and proxies."
+)
+
+
+STARTER_SI = (
+"Let's discuss how sampling error leads to uncertainty, and how t-tests "
+"quantify whether observed differences are likely due to chance."
+)
+
+
+STARTER_REG = (
+"**Goal:** Practice interpretation of coefficients, SEs, p-values, and model fit.\n\n"
+"**Coach prompts:** Omitted variable bias, sign/direction, magnitude vs significance."
+)
+
+
+STARTER_WR = (
+"**Goal:** Draft a short, sober results paragraph (hypothetical).\n\n"
+"**Coach prompts:** Scope conditions, limitations, effect sizes, and policy relevance."
+)
+
+
+MODULE_STARTERS = {
+    "Scientific Method": STARTER_SM,
+    "Hypothesis Design": STARTER_HYP,
+    "Variable Measurement": STARTER_VM,
+    "Sampling & Inference": STARTER_SI,
+    "Regression Logic": STARTER_REG,
+    "Writing & Reporting": STARTER_WR,
+}
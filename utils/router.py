@@ -0,0 +1,119 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/router.py — per-turn model routing for the "Auto" model choice
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Each chat turn is classified locally (no extra API call) from cheap features:
+# prompt length in tokens, module, question type and conversation depth. Easy
+# turns go to the fast model; demanding ones (interpretation, design critique,
+# long multi-part questions) go to the strong model. A fast-model reply that
+# looks weak on a borderline turn can be upgraded once to the strong model.
+# ─────────────────────────────────────────────────────────────────────────────
+
+import re
+import threading
+from typing import Dict, NamedTuple
+
+AUTO_MODEL = "Auto"
+FAST_MODEL = "gpt-4o-mini"
+STRONG_MODEL = "gpt-4o"
+MODEL_CHOICES = ["gpt-4o-mini", "gpt-4o", "gpt-4.1-mini", AUTO_MODEL]
+
+# Score at or above which a turn goes to the strong model
+THRESHOLD = 3.0
+# Turns scoring within this margin of THRESHOLD are "borderline"
+BORDERLINE = 1.0
+
+# Modules whose questions tend to need careful quantitative reasoning
+MODULE_WEIGHT = {
+    "Regression Logic": 1.5,
+    "Sampling & Inference": 1.0,
+    "Hypothesis Design": 0.5,
+    "Variable Measurement": 0.5,
+}
+
+HARD_PATTERNS = re.compile(
+    r"\b(interpret\w*|why|explain|compare|difference between|omitted|confound\w*|"
+    r"endogene\w*|causal\w*|mechanism|critique|evaluate|assess|p-?value|coefficient|"
+    r"standard error|significan\w*|regression|control for|bias)\b",
+    re.IGNORECASE,
+)
+EASY_PATTERNS = re.compile(
+    r"^\s*(ok(ay)?|thanks?|thank you|got it|yes|no|sure|what is|what's|define|"
+    r"what does .{1,30} mean|can you repeat|example\??)\b",
+    re.IGNORECASE,
+)
+WEAK_REPLY = re.compile(r"\b(i'?m not sure|i am not sure|it depends|unclear|i cannot)\b", re.IGNORECASE)
+
+
+class Route(NamedTuple):
+    model: str
+    score: float
+    borderline: bool
+    reason: str
+
+
+# -----------------------------------------------------------------------------
+# Classification
+# -----------------------------------------------------------------------------
+def route(prompt: str, module_key: str, history_len: int, n_tokens: int) -> Route:
+    """Pick a model for one turn from local features only."""
+    score = MODULE_WEIGHT.get(module_key, 0.0)
+    reasons = []
+
+    hard_hits = len(HARD_PATTERNS.findall(prompt))
+    if hard_hits:
+        score += min(hard_hits, 3)
+        reasons.append(f"{hard_hits} reasoning cue(s)")
+    if EASY_PATTERNS.match(prompt):
+        score -= 2.0
+        reasons.append("clarification")
+
+    if n_tokens > 150:
+        score += 1.5
+        reasons.append("long prompt")
+    elif n_tokens > 60:
+        score += 0.5
+    if prompt.count("?") > 1:
+        score += 0.5
+        reasons.append("multi-part")
+    if history_len >= 10:
+        score += 0.5
+        reasons.append("deep conversation")
+
+    model = STRONG_MODEL if score >= THRESHOLD else FAST_MODEL
+    borderline = abs(score - THRESHOLD) < BORDERLINE
+    return Route(model, score, borderline, ", ".join(reasons) or "default")
+
+
+def should_upgrade(decision: Route, reply: str) -> bool:
+    """True if a borderline fast-model reply looks too weak to keep."""
+    if decision.model != FAST_MODEL or not decision.borderline:
+        return False
+    return len(reply.split()) < 25 or bool(WEAK_REPLY.search(reply))
+
+
+# -----------------------------------------------------------------------------
+# Process-wide routing stats
+# -----------------------------------------------------------------------------
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, float]] = {}
+
+def record(model: str, latency: float, upgraded: bool = False):
+    """Record one routed turn and its end-to-end latency in seconds."""
+    with _stats_lock:
+        s = _stats.setdefault(model, {"turns": 0, "latency_total": 0.0, "upgrades": 0})
+        s["turns"] += 1
+        s["latency_total"] += latency
+        s["upgrades"] += int(upgraded)
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """Per-model routed turn counts, upgrade counts and mean latency."""
+    with _stats_lock:
+        return {
+            model: {
+                "turns": s["turns"],
+                "upgrades": s["upgrades"],
+                "mean_latency_s": round(s["latency_total"] / s["turns"], 2) if s["turns"] else 0.0,
+            }
+            for model, s in _stats.items()
+        }
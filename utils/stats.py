@@ -0,0 +1,225 @@
+# ─────────────────────────────────────────────────────────────────────────────
+# utils/stats.py — streaming summary statistics and t-tests for uploaded data
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Uploaded CSVs (ANES / CCES extracts can exceed 100 MB) are read in fixed-size
+# chunks. Each chunk is reduced to (count, mean, M2) and merged with Chan et
+# al.'s pairwise update, so the parsing working set is bounded by the chunk
+# size and the result is numerically stable regardless of file length.
+# This does not bound total memory: Streamlit's file_uploader holds the raw
+# upload in RAM for the session (capped by server.maxUploadSize).
+# ─────────────────────────────────────────────────────────────────────────────
+
+import math
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import stats as sps
+
+CHUNK_ROWS = 100_000
+MAX_LEVELS = 50  # columns with more distinct values are not offered as groups
+
+
+# -----------------------------------------------------------------------------
+# Running moments (Welford / Chan)
+# -----------------------------------------------------------------------------
+class RunningMoments:
+    """Count, mean and sum of squared deviations (M2), mergeable across chunks."""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def merge(self, count: int, mean: float, m2: float):
+        """Fold in another batch's (count, mean, M2)."""
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values: Iterable[float]):
+        """Fold in a chunk of raw values (NaNs are ignored)."""
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if x.size:
+            mean = float(x.mean())
+            self.merge(int(x.size), mean, float(((x - mean) ** 2).sum()))
+
+    def remove(self, values: Iterable[float]):
+        """Take a chunk of previously added values back out (inverse of update)."""
+        x = np.asarray(values, dtype=float)
+        x = x[~np.isnan(x)]
+        if not x.size:
+            return
+        rest = self.count - x.size
+        if rest <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean_b = float(x.mean())
+        m2_b = float(((x - mean_b) ** 2).sum())
+        mean_a = (self.count * self.mean - x.size * mean_b) / rest
+        delta = mean_b - mean_a
+        self.m2 = max(self.m2 - m2_b - delta * delta * rest * x.size / self.count, 0.0)
+        self.mean = mean_a
+        self.count = rest
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (ddof=1)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else float("nan")
+
+    @property
+    def sd(self) -> float:
+        return math.sqrt(self.variance)
+
+    def __repr__(self):
+        return f"RunningMoments(count={self.count}, mean={self.mean:.4g}, sd={self.sd:.4g})"
+
+
+class SamplingDistribution:
+    """
+    A growing/shrinking set of simulated statistics with running moments and
+    fixed-bin histogram counts, so resizing costs O(Δ) rather than O(total).
+    """
+
+    def __init__(self, edges: np.ndarray):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=int)
+        self.moments = RunningMoments()
+        self._values = np.empty(0)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self._n]
+
+    def _hist(self, x: np.ndarray) -> np.ndarray:
+        # Out-of-range values land in the end bins so counts stay subtractable
+        return np.histogram(np.clip(x, self.edges[0], self.edges[-1]), bins=self.edges)[0]
+
+    def resize(self, target: int, draw: Callable[[int], np.ndarray]):
+        """Grow to ``target`` by drawing only the delta, or truncate to it."""
+        if target > self._n:
+            new = np.asarray(draw(target - self._n), dtype=float)
+            if target > self._values.size:
+                grown = np.empty(max(target, 2 * self._values.size))
+                grown[:self._n] = self.values
+                self._values = grown
+            self._values[self._n:target] = new
+            self.moments.update(new)
+            self.counts += self._hist(new)
+        elif target < self._n:
+            dropped = self._values[target:self._n]
+            self.moments.remove(dropped)
+            self.counts -= self._hist(dropped)
+        self._n = target
+
+
+# -----------------------------------------------------------------------------
+# Chunked CSV passes
+# -----------------------------------------------------------------------------
+def _chunks(source, usecols=None, chunksize: int = CHUNK_ROWS):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return pd.read_csv(source, usecols=usecols, chunksize=chunksize, low_memory=True)
+
+def summarize_csv(source, chunksize: int = CHUNK_ROWS, max_levels: int = MAX_LEVELS) -> Dict:
+    """
+    One streaming pass over a CSV.
+
+    Returns
+    -------
+    dict
+        ``rows``: total row count; ``numeric``: {column: RunningMoments} for
+        columns that parse as numbers; ``levels``: {column: {value: count}}
+        for columns with at most ``max_levels`` distinct values.
+    """
+    rows = 0
+    numeric: Optional[Dict[str, RunningMoments]] = None
+    levels: Dict[str, Dict] = {}
+
+    for chunk in _chunks(source, chunksize=chunksize):
+        rows += len(chunk)
+        if numeric is None:
+            numeric = {c: RunningMoments() for c in chunk.select_dtypes("number").columns}
+            levels = {c: {} for c in chunk.columns}
+        for col, moments in numeric.items():
+            moments.update(pd.to_numeric(chunk[col], errors="coerce").to_numpy())
+        for col in list(levels):
+            counts = levels[col]
+            for value, n in chunk[col].dropna().value_counts().items():
+                counts[value] = counts.get(value, 0) + int(n)
+            if len(counts) > max_levels:
+                del levels[col]
+
+    return {"rows": rows, "numeric": numeric or {}, "levels": levels}
+
+def grouped_moments(source, value_col: str, group_col: str,
+                    chunksize: int = CHUNK_ROWS) -> Dict[object, RunningMoments]:
+    """Streaming per-group moments of ``value_col`` split by ``group_col``."""
+    groups: Dict[object, RunningMoments] = {}
+    for chunk in _chunks(source, usecols=[value_col, group_col], chunksize=chunksize):
+        values = pd.to_numeric(chunk[value_col], errors="coerce")
+        agg = values.groupby(chunk[group_col]).agg(["count", "mean", "var"])
+        for level, row in agg.iterrows():
+            n = int(row["count"])
+            if n:
+                m2 = float(row["var"]) * (n - 1) if n > 1 else 0.0
+                groups.setdefault(level, RunningMoments()).merge(n, float(row["mean"]), m2)
+    return groups
+
+
+# -----------------------------------------------------------------------------
+# t-tests from summary statistics
+# -----------------------------------------------------------------------------
+def _untestable(note: str, **fields) -> Dict[str, float]:
+    nan = float("nan")
+    return {"se": nan, "t": nan, "df": nan, "p": nan, **fields, "note": note}
+
+def one_sample_t(m: RunningMoments, mu0: float) -> Dict[str, float]:
+    """
+    One-sample t-test of H0: mean = mu0 (two-sided).
+
+    When the test is undefined (fewer than two values, or no variation) the
+    statistics are NaN and ``note`` explains why.
+    """
+    if m.count < 2:
+        return _untestable("At least two non-missing values are needed for a t-test.",
+                           n=m.count, mean=m.mean, sd=m.sd)
+    se = m.sd / math.sqrt(m.count)
+    if se == 0:
+        return _untestable("Every value is the same, so the standard error is zero "
+                           "and the t statistic is undefined.", n=m.count, mean=m.mean, sd=m.sd)
+    t = (m.mean - mu0) / se
+    df = m.count - 1
+    return {"n": m.count, "mean": m.mean, "sd": m.sd, "se": se,
+            "t": t, "df": df, "p": 2 * sps.t.sf(abs(t), df), "note": ""}
+
+def welch_t(a: RunningMoments, b: RunningMoments) -> Dict[str, float]:
+    """
+    Welch difference-of-means test (unequal variances, two-sided).
+
+    When the test is undefined (a group with fewer than two values, or no
+    variation in either group) the statistics are NaN and ``note`` explains why.
+    """
+    diff = a.mean - b.mean
+    if a.count < 2 or b.count < 2:
+        return _untestable("Each group needs at least two non-missing values.", diff=diff)
+    va, vb = a.variance / a.count, b.variance / b.count
+    se = math.sqrt(va + vb)
+    if se == 0:
+        return _untestable("Neither group varies, so the standard error is zero "
+                           "and the t statistic is undefined.", diff=diff)
+    t = diff / se
+    df = (va + vb) ** 2 / (va ** 2 / (a.count - 1) + vb ** 2 / (b.count - 1))
+    return {"diff": diff, "se": se, "t": t, "df": df, "p": 2 * sps.t.sf(abs(t), df), "note": ""}